@@ -3,7 +3,8 @@
 Fetches pictograms from the ARASAAC API (https://arasaac.org) and caches
 them locally. Includes Swedish ↔ English translation mapping (15,606 terms)
 by Daniel Nylander, enabling Swedish pictogram search with intelligent
-fallback strategies.
+fallback strategies. A bundled Swedish term → pictogram ID index (13,046
+terms) answers most searches without a network round-trip.
 
 ARASAAC pictograms are licensed under Creative Commons BY-NC-SA 4.0
 by the Government of Aragon, created by Sergio Palao.
@@ -18,19 +19,45 @@ Usage:
 
 from __future__ import annotations
 
+import io
 import json
+import logging
 import os
+import re
+import tarfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from importlib import resources
 from pathlib import Path
-from typing import Optional, List, Dict
-from urllib.request import urlopen, Request
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence
 from urllib.error import URLError
 from urllib.parse import quote
 
+from bildordbok import ordlista
+from bildordbok.cache import FileCache, SearchCache, valid_png
+from bildordbok.httppool import get_pool
+
+log = logging.getLogger(__name__)
 
 ARASAAC_API = "https://api.arasaac.org/v1"
 ARASAAC_IMAGE = "https://static.arasaac.org/pictograms/{picto_id}/{picto_id}_{resolution}.png"
 VALID_RESOLUTIONS = [300, 500, 2500]
+DEFAULT_IMAGE_CACHE_BYTES = 200 * 1024 * 1024
+SEARCH_DEADLINE = 12  # seconds for all search_swedish strategies together
+
+# Bounded pool for concurrent API searches, shared by all providers
+_search_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="arasaac-search")
+
+
+_IMAGE_NAME = re.compile(r"\d+_\d+\.png")
+_ARCHIVE_SEARCHES = "search_cache.json"
+
+
+def _snap_resolution(resolution: int) -> int:
+    """Map a requested size to the nearest resolution ARASAAC serves."""
+    if resolution in VALID_RESOLUTIONS:
+        return resolution
+    return min(VALID_RESOLUTIONS, key=lambda r: abs(r - resolution))
 
 
 def _load_json_data(filename: str) -> dict:
@@ -53,7 +80,8 @@ def _load_json_data(filename: str) -> dict:
 class ArasaacProvider:
     """Enhanced ARASAAC provider with Swedish ordlista support."""
 
-    def __init__(self, cache_dir: Optional[str] = None):
+    def __init__(self, cache_dir: Optional[str] = None,
+                 image_cache_bytes: int = DEFAULT_IMAGE_CACHE_BYTES):
         if cache_dir is None:
             cache_dir = os.path.join(
                 os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
@@ -62,52 +90,100 @@ class ArasaacProvider:
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         
-        # Load ordlista
-        self._en2sv: Optional[Dict[str, str]] = None
-        self._sv2en: Optional[Dict[str, List[str]]] = None
+        # Load ordlista (compiled ordlista.bin, JSON as fallback)
+        self._compiled: Optional[ordlista.CompiledOrdlista] = None
+        self._compiled_checked = False
+        self._en2sv: Optional[Mapping[str, str]] = None
+        self._sv2en: Optional[Mapping[str, List[str]]] = None
+        self._sv_index: Optional[Mapping[str, List[int]]] = None
         
+        # Guards lazy loads; the provider is shared by the pictogram
+        # loader's worker threads.
+        self._lock = threading.RLock()
+
         # Search cache
-        self._search_cache: Dict[str, List[Dict]] = {}
-        self._load_search_cache()
+        self._search_cache = SearchCache(self.cache_dir / "search_cache.sqlite3")
+        self._migrate_search_cache()
+
+        # Downloaded pictogram images
+        self.images = FileCache(self.cache_dir, image_cache_bytes,
+                                pattern=_IMAGE_NAME.pattern, validator=valid_png)
+
+    def _get_compiled(self) -> Optional[ordlista.CompiledOrdlista]:
+        """Map the precompiled ordlista once, if it ships with the package."""
+        with self._lock:
+            if not self._compiled_checked:
+                self._compiled = ordlista.load_compiled()
+                self._compiled_checked = True
+            return self._compiled
 
-    def _get_en2sv(self) -> Dict[str, str]:
+    def _get_en2sv(self) -> Mapping[str, str]:
         """Lazy-load English → Swedish ordlista."""
-        if self._en2sv is None:
-            self._en2sv = _load_json_data("arasaac_en2sv.json")
-        return self._en2sv
+        with self._lock:
+            if self._en2sv is None:
+                compiled = self._get_compiled()
+                if compiled is not None:
+                    self._en2sv = compiled.en2sv
+                else:
+                    self._en2sv = _load_json_data("arasaac_en2sv.json")
+            return self._en2sv
 
-    def _get_sv2en(self) -> Dict[str, List[str]]:
+    def _get_sv2en(self) -> Mapping[str, List[str]]:
         """Lazy-load Swedish → English reverse lookup."""
-        if self._sv2en is None:
-            en2sv = self._get_en2sv()
-            sv2en = {}
-            for en_term, sv_term in en2sv.items():
-                if sv_term not in sv2en:
-                    sv2en[sv_term] = []
-                sv2en[sv_term].append(en_term)
-            self._sv2en = sv2en
-        return self._sv2en
+        with self._lock:
+            if self._sv2en is None:
+                compiled = self._get_compiled()
+                if compiled is not None:
+                    self._sv2en = compiled.sv2en
+                    return self._sv2en
+                en2sv = self._get_en2sv()
+                sv2en = {}
+                for en_term, sv_term in en2sv.items():
+                    if sv_term not in sv2en:
+                        sv2en[sv_term] = []
+                    sv2en[sv_term].append(en_term)
+                self._sv2en = sv2en
+            return self._sv2en
+
+    def _get_sv_index(self) -> Mapping[str, List[int]]:
+        """Lazy-load the bundled Swedish term → pictogram IDs index."""
+        with self._lock:
+            if self._sv_index is None:
+                compiled = self._get_compiled()
+                if compiled is not None:
+                    self._sv_index = compiled.sv2id
+                    return self._sv_index
+                index = _load_json_data("arasaac_sv.json")
+                self._sv_index = {
+                    term: ids for term, ids in index.items()
+                    if isinstance(ids, list)
+                }
+            return self._sv_index
+
+    def _local_search(self, sv_term: str, en_term: Optional[str] = None) -> List[Dict]:
+        """Resolve a Swedish term from the bundled index, without network."""
+        ids = self._get_sv_index().get(sv_term, [])
+        results = []
+        for picto_id in ids:
+            result = {"_id": picto_id, "swedish_keyword": sv_term, "keywords": []}
+            if en_term:
+                result["keywords"].append({"locale": "en", "keyword": en_term})
+            results.append(result)
+        return results
 
     def translate_sv(self, en_term: str) -> str:
         """Get Swedish label for an English keyword, or return original."""
         return self._get_en2sv().get(en_term.lower(), en_term)
 
-    def _load_search_cache(self):
-        """Load search cache from disk."""
-        cache_file = self.cache_dir / "search_cache_v2.json"
-        if cache_file.exists():
+    def _migrate_search_cache(self):
+        """Move entries from the old single-file JSON cache into SQLite."""
+        legacy = self.cache_dir / "search_cache_v2.json"
+        if legacy.exists():
+            self._search_cache.import_json(legacy)
             try:
-                self._search_cache = json.loads(cache_file.read_text())
-            except (json.JSONDecodeError, OSError):
-                self._search_cache = {}
-
-    def _save_search_cache(self):
-        """Save search cache to disk."""
-        cache_file = self.cache_dir / "search_cache_v2.json"
-        try:
-            cache_file.write_text(json.dumps(self._search_cache, ensure_ascii=False))
-        except OSError:
-            pass
+                legacy.unlink()
+            except OSError:
+                pass
 
     def _api_search(self, term: str, lang: str = "en") -> List[Dict]:
         """Search ARASAAC API for pictograms."""
@@ -115,13 +191,9 @@ class ArasaacProvider:
         url = f"{ARASAAC_API}/pictograms/{lang}/search/{encoded_term}"
         
         try:
-            req = Request(url, headers={
-                "Accept": "application/json",
-                "User-Agent": "Bildordbok-Swedish-Ordlista/1.0"
-            })
-            with urlopen(req, timeout=10) as resp:
-                data = json.loads(resp.read())
-                return data if isinstance(data, list) else []
+            body = get_pool().get(url, headers={"Accept": "application/json"}, timeout=10)
+            data = json.loads(body)
+            return data if isinstance(data, list) else []
         except (URLError, json.JSONDecodeError, KeyError):
             return []
 
@@ -131,18 +203,51 @@ class ArasaacProvider:
         1. Try Swedish directly with ARASAAC API
         2. Find English equivalents and search those
         3. Combine results and add Swedish labels
+
+        The API searches run concurrently; whatever has arrived after
+        SEARCH_DEADLINE seconds is returned.
         """
         sv_term_lower = sv_term.lower().strip()
         cache_key = f"sv:{sv_term_lower}"
         
-        if cache_key in self._search_cache:
-            return self._search_cache[cache_key]
+        cached = self._search_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        local_results = self._local_search(sv_term_lower)
+        if local_results:
+            return local_results[:limit]
         
+        # Run all strategies at once; each is one blocking API round-trip
+        sv2en = self._get_sv2en()
+        english_terms = list(sv2en.get(sv_term_lower, []))[:3]  # Limit English terms
+        swedish_future = _search_pool.submit(self._api_search, sv_term, "sv")
+        english_futures = [_search_pool.submit(self._api_search, en_term, "en")
+                           for en_term in english_terms]
+        all_futures = [swedish_future] + english_futures
+        _done, pending = wait(all_futures, timeout=SEARCH_DEADLINE)
+        for future in pending:
+            future.cancel()
+
+        failed = False
+
+        def _result(future) -> List[Dict]:
+            nonlocal failed
+            if future in pending:
+                return []
+            try:
+                return future.result()
+            except Exception:
+                # One bad term must not sink the others; like a timeout
+                log.warning("ARASAAC search for %r failed", sv_term, exc_info=True)
+                failed = True
+                return []
+
         results = []
         seen_ids = set()
         
         # Strategy 1: Try Swedish term directly
-        swedish_results = self._api_search(sv_term, lang="sv")
+        swedish_results = _result(swedish_future)
         for result in swedish_results[:limit//2]:  # Limit Swedish results
             picto_id = result.get("_id")
             if picto_id and picto_id not in seen_ids:
@@ -150,27 +255,24 @@ class ArasaacProvider:
                 result["swedish_keyword"] = sv_term
                 results.append(result)
         
-        # Strategy 2: Find English equivalents and search those
-        sv2en = self._get_sv2en()
-        if sv_term_lower in sv2en:
-            english_terms = sv2en[sv_term_lower]
-            for en_term in english_terms[:3]:  # Limit English terms
-                english_results = self._api_search(en_term, lang="en")
-                for result in english_results[:5]:  # Limit per English term
-                    picto_id = result.get("_id")
-                    if picto_id and picto_id not in seen_ids:
-                        seen_ids.add(picto_id)
-                        result["swedish_keyword"] = sv_term
-                        results.append(result)
-                    
-                    if len(results) >= limit:
-                        break
+        # Strategy 2: English equivalents, merged in ordlista order
+        for future in english_futures:
+            english_results = _result(future)
+            for result in english_results[:5]:  # Limit per English term
+                picto_id = result.get("_id")
+                if picto_id and picto_id not in seen_ids:
+                    seen_ids.add(picto_id)
+                    result["swedish_keyword"] = sv_term
+                    results.append(result)
+                
                 if len(results) >= limit:
                     break
+            if len(results) >= limit:
+                break
         
-        # Cache the results
-        self._search_cache[cache_key] = results[:limit]
-        self._save_search_cache()
+        # Cache the results, unless a slow or failed source left them incomplete
+        if not pending and not failed:
+            self._search_cache.put(cache_key, results[:limit])
         
         return results[:limit]
 
@@ -178,13 +280,20 @@ class ArasaacProvider:
         """Search for English term and add Swedish labels where available."""
         cache_key = f"en:{en_term.lower()}"
         
-        if cache_key in self._search_cache:
-            return self._search_cache[cache_key]
+        cached = self._search_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        en2sv = self._get_en2sv()
+        sv_term = en2sv.get(en_term.lower().strip())
+        if sv_term:
+            local_results = self._local_search(sv_term, en_term=en_term)
+            if local_results:
+                return local_results[:limit]
         
         results = self._api_search(en_term, lang="en")
         
         # Add Swedish keywords where available
-        en2sv = self._get_en2sv()
         for result in results:
             # Find best English keyword to translate
             for kw in result.get("keywords", []):
@@ -194,8 +303,7 @@ class ArasaacProvider:
                         result["swedish_keyword"] = en2sv[en_keyword]
                         break
         
-        self._search_cache[cache_key] = results[:limit]
-        self._save_search_cache()
+        self._search_cache.put(cache_key, results[:limit])
         
         return results[:limit]
 
@@ -241,22 +349,18 @@ class ArasaacProvider:
 
     def get_image_path(self, picto_id: int, resolution: int = 300) -> Optional[str]:
         """Download and cache pictogram image."""
-        if resolution not in VALID_RESOLUTIONS:
-            resolution = min(VALID_RESOLUTIONS, key=lambda r: abs(r - resolution))
+        resolution = _snap_resolution(resolution)
         
         filename = f"{picto_id}_{resolution}.png"
-        local_path = self.cache_dir / filename
-        
-        if local_path.exists():
-            return str(local_path)
+        cached = self.images.get(filename)
+        if cached is not None:
+            return str(cached)
         
         url = ARASAAC_IMAGE.format(picto_id=picto_id, resolution=resolution)
         
         try:
-            req = Request(url, headers={"User-Agent": "Bildordbok-Swedish-Ordlista/1.0"})
-            with urlopen(req, timeout=15) as resp:
-                local_path.write_bytes(resp.read())
-                return str(local_path)
+            path = self.images.put(filename, get_pool().get(url, timeout=15))
+            return str(path) if path is not None else None
         except (URLError, OSError):
             return None
 
@@ -267,6 +371,125 @@ class ArasaacProvider:
             return self.get_image_path(picto_id, resolution=resolution)
         return None
 
+    def prefetch(self, terms: Iterable[str], lang: str = "en",
+                 resolutions: Sequence[int] = (300,), workers: int = 8,
+                 progress: Optional[Callable[[int, int, str], None]] = None) -> Dict[str, int]:
+        """Resolve and download pictograms for many terms in parallel.
+
+        Every finished search and image lands in the caches, so an
+        interrupted run resumes where it stopped and a repeated run does
+        no network work. progress(done, total, term) is called from
+        worker threads.
+        """
+        terms = list(dict.fromkeys(t for t in terms if t))
+        stats = {"terms": len(terms), "resolved": 0, "missing": 0,
+                 "downloaded": 0, "cached": 0, "failed": 0}
+        stats_lock = threading.Lock()
+        done = 0
+
+        def _fetch(term: str):
+            nonlocal done
+            counts = {"resolved": 0, "missing": 0, "downloaded": 0, "cached": 0, "failed": 0}
+            picto_id = self.search(term, lang=lang)
+            if picto_id is None:
+                counts["missing"] += 1
+            else:
+                counts["resolved"] += 1
+                for resolution in resolutions:
+                    if self.has_image(picto_id, resolution):
+                        counts["cached"] += 1
+                    elif self.get_image_path(picto_id, resolution=resolution):
+                        counts["downloaded"] += 1
+                    else:
+                        counts["failed"] += 1
+            with stats_lock:
+                for key, value in counts.items():
+                    stats[key] += value
+                done += 1
+                finished = done
+            if progress:
+                progress(finished, len(terms), term)
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="arasaac-prefetch") as pool:
+            for future in [pool.submit(_fetch, term) for term in terms]:
+                future.result()
+        return stats
+
+    def has_image(self, picto_id: int, resolution: int = 300) -> bool:
+        """Whether an image is already in the local cache."""
+        return self.images.contains(f"{picto_id}_{_snap_resolution(resolution)}.png")
+
+    def cached_image_path(self, picto_id: int, resolution: int = 300) -> Optional[str]:
+        """Path of a cached image, never downloading."""
+        cached = self.images.get(f"{picto_id}_{_snap_resolution(resolution)}.png")
+        return str(cached) if cached is not None else None
+
+    def cached_ids(self, terms: Iterable[str], lang: str = "en") -> Dict[str, int]:
+        """First pictogram id per term from cached searches and the bundled index.
+
+        Never touches the network; terms nobody has searched for yet and
+        that the index does not know are left out.
+        """
+        terms = list(dict.fromkeys(t.lower().strip() for t in terms if t))
+        prefix = "sv:" if lang == "sv" else "en:"
+        found = self._search_cache.get_many(prefix + t for t in terms)
+        en2sv = self._get_en2sv() if lang != "sv" else None
+        ids: Dict[str, int] = {}
+        for term in terms:
+            results = found.get(prefix + term)
+            if results is None:
+                sv_term = term if en2sv is None else en2sv.get(term)
+                results = self._local_search(sv_term) if sv_term else []
+            picto_id = results[0].get("_id") if results else None
+            if picto_id is not None:
+                ids[term] = picto_id
+        return ids
+
+    def export_archive(self, archive_path) -> int:
+        """Pack cached images and searches into a .tar.gz; returns file count."""
+        images = sorted(self.cache_dir / name for name in self.images.names())
+        searches = json.dumps(dict(self._search_cache.items()), ensure_ascii=False)
+        with tarfile.open(archive_path, "w:gz") as tar:
+            data = searches.encode("utf-8")
+            info = tarfile.TarInfo(_ARCHIVE_SEARCHES)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+            for image in images:
+                tar.add(str(image), arcname=f"images/{image.name}")
+        return len(images)
+
+    def import_archive(self, archive_path) -> int:
+        """Unpack an archive made by export_archive; returns images added."""
+        added = 0
+        with tarfile.open(archive_path, "r:*") as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                if member.name == _ARCHIVE_SEARCHES:
+                    data = json.loads(tar.extractfile(member).read())
+                    if isinstance(data, dict):
+                        self._search_cache.update(data)
+                    continue
+                name = member.name.rsplit("/", 1)[-1]
+                if not member.name.startswith("images/") or not _IMAGE_NAME.fullmatch(name):
+                    continue
+                if self.images.contains(name):
+                    continue
+                if self.images.put(name, tar.extractfile(member).read()):
+                    added += 1
+        return added
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Image cache counters plus the number of cached searches."""
+        stats = self.images.stats()
+        stats["searches"] = len(self._search_cache)
+        return stats
+
+    def clear_cache(self):
+        """Remove all cached images and searches."""
+        self.images.clear()
+        self._search_cache.clear()
+
 
 _default_provider: Optional[ArasaacProvider] = None
 
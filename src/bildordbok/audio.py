@@ -0,0 +1,203 @@
+"""Audio output for text-to-speech.
+
+Installed players come from the capability registry. The first of
+pw-play, paplay and aplay is started as one long-lived process per
+sample rate that reads raw 16-bit mono PCM on stdin, so speech is
+written to it instead of starting a player for every word. ``ffplay``
+cannot be kept open that way and is only used for WAV files.
+"""
+
+from __future__ import annotations
+
+import atexit
+import subprocess
+import threading
+import time
+import wave
+from typing import Dict, List, Optional
+
+from bildordbok.capabilities import get_capabilities
+
+# Players that can read raw PCM from stdin, in order of preference
+_RAW_PLAYERS = {
+    "pw-play": lambda rate: ["--rate", str(rate), "--format", "s16", "--channels", "1", "-"],
+    "paplay": lambda rate: ["--raw", f"--rate={rate}", "--format=s16le", "--channels=1"],
+    "aplay": lambda rate: ["-q", "-t", "raw", "-f", "S16_LE", "-r", str(rate), "-c", "1", "-"],
+}
+
+_lock = threading.Lock()
+_players: Dict[int, "RawPlayer"] = {}
+# One-shot player processes (WAV files, espeak-ng speaking directly)
+_children: List[subprocess.Popen] = []
+# Bumped to drop audio requested earlier; see epoch()
+_epoch = 0
+# When the PCM written to raw players so far will have played out
+_busy_until = 0.0
+
+
+def _discover() -> Dict[str, str]:
+    """Name → path of installed players."""
+    return get_capabilities().players
+
+
+def raw_command(rate: int) -> Optional[List[str]]:
+    found = _discover()
+    for name, args in _RAW_PLAYERS.items():
+        if name in found:
+            return [found[name], *args(rate)]
+    return None
+
+
+class RawPlayer:
+    """A player process fed raw PCM, restarted if it dies."""
+
+    def __init__(self, rate: int):
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._proc: Optional[subprocess.Popen] = None
+
+    def _ensure(self) -> bool:
+        if self._proc is not None and self._proc.poll() is None:
+            return True
+        cmd = raw_command(self.rate)
+        if cmd is None:
+            return False
+        try:
+            self._proc = subprocess.Popen(
+                cmd, stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except OSError:
+            self._proc = None
+            return False
+        return True
+
+    def write(self, pcm: bytes, epoch: Optional[int] = None) -> bool:
+        """Queue PCM for playback; False if no player could take it.
+
+        Nothing is written once the epoch has moved past ``epoch``.
+        """
+        global _busy_until
+        if epoch is None:
+            epoch = _epoch
+        with self._lock:
+            for _attempt in range(2):
+                # Audio from before a stop must not start a new player
+                if _epoch != epoch or not self._ensure():
+                    return False
+                try:
+                    self._proc.stdin.write(pcm)
+                    self._proc.stdin.flush()
+                    now = time.monotonic()
+                    _busy_until = max(now, _busy_until) + len(pcm) / (2 * self.rate)
+                    return True
+                except (OSError, ValueError, AttributeError):
+                    # AttributeError: stop() cleared _proc under us
+                    self._proc = None
+            return False
+
+    def stop(self):
+        """Cut playback off; the next write starts a fresh player.
+
+        Does not take the write lock, which a writer blocked on a full
+        pipe may be holding; killing the process unblocks it.
+        """
+        proc, self._proc = self._proc, None
+        if proc is not None:
+            proc.kill()
+            proc.wait()
+
+
+def get_player(rate: int) -> Optional[RawPlayer]:
+    """Long-lived player for a sample rate, or None without a raw player."""
+    if raw_command(rate) is None:
+        return None
+    with _lock:
+        player = _players.get(rate)
+        if player is None:
+            player = _players[rate] = RawPlayer(rate)
+        return player
+
+
+def track(proc: subprocess.Popen):
+    """Register a one-shot audio process so stop_all can cut it off."""
+    with _lock:
+        _children[:] = [p for p in _children if p.poll() is None]
+        _children.append(proc)
+
+
+def epoch() -> int:
+    """Current audio epoch; pass it to play_wav to drop superseded audio."""
+    return _epoch
+
+
+def cancel_pending():
+    """Drop audio requested before now, without stopping what is playing."""
+    global _epoch
+    _epoch += 1
+
+
+def is_playing() -> bool:
+    """Whether any audio is still playing or queued in a player."""
+    if time.monotonic() < _busy_until:
+        return True
+    with _lock:
+        return any(p.poll() is None for p in _children)
+
+
+def stop_all():
+    """Stop everything that is playing and drop audio requested so far."""
+    cancel_pending()
+    stop_playback()
+
+
+def stop_playback():
+    """Kill every player; for callers that already called cancel_pending."""
+    global _busy_until
+    _busy_until = 0.0
+    with _lock:
+        players = list(_players.values())
+        children, _children[:] = list(_children), []
+    for player in players:
+        player.stop()
+    for proc in children:
+        if proc.poll() is None:
+            proc.kill()
+
+
+atexit.register(stop_all)
+
+
+def play_wav(path: str, epoch: Optional[int] = None) -> bool:
+    """Play a WAV file, through a long-lived player when its format allows.
+
+    Returns False if nothing could play it, or if the epoch has moved
+    past ``epoch`` (the request was superseded).
+    """
+    if epoch is None:
+        epoch = _epoch
+    try:
+        with wave.open(path, "rb") as w:
+            raw_ok = w.getsampwidth() == 2 and w.getnchannels() == 1
+            rate = w.getframerate()
+            frames = w.readframes(w.getnframes()) if raw_ok else b""
+    except (OSError, EOFError, wave.Error):
+        raw_ok = False
+    if raw_ok:
+        player = get_player(rate)
+        if player is not None and player.write(frames, epoch):
+            return True
+    for name, exe in _discover().items():
+        if _epoch != epoch:
+            return False
+        args = [exe]
+        if name == "ffplay":
+            args += ["-nodisp", "-autoexit"]
+        args.append(path)
+        try:
+            track(subprocess.Popen(args,
+                                   stdout=subprocess.DEVNULL,
+                                   stderr=subprocess.DEVNULL))
+            return True
+        except Exception:
+            continue
+    return False
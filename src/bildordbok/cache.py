@@ -0,0 +1,413 @@
+"""Persistent caches shared by the ARASAAC provider and friends.
+
+SearchCache keeps small JSON values in SQLite, one row per key, so a
+lookup reads a single row and a miss writes a single row no matter how
+large the cache has grown. Entries expire after a TTL and the least
+recently used ones are evicted once the entry cap is reached.
+
+FileCache manages a directory of files under a byte budget. Files are
+written to a temporary name and renamed into place, checked by an
+optional validator, and evicted least recently used first.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_TTL = 90 * 86400  # seconds
+# Access times are only rewritten when older than this, so hot keys do
+# not turn every read into a write.
+_TOUCH_INTERVAL = 3600
+
+
+class SearchCache:
+    """Bounded key → JSON value store with LRU and TTL eviction.
+
+    SQLite errors are never raised: a failed read is a miss, a failed
+    write is dropped, and a database that cannot be opened (corrupt,
+    locked, read-only) is replaced by an in-memory one.
+    """
+
+    def __init__(self, path, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl: float = DEFAULT_TTL):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        try:
+            self._db, self._count = self._open(str(self.path))
+        except sqlite3.Error:
+            # Corrupt, locked or read-only: cache for this session only
+            self._db, self._count = self._open(":memory:")
+
+    @staticmethod
+    def _open(target: str) -> Tuple[sqlite3.Connection, int]:
+        db = sqlite3.connect(target, check_same_thread=False, isolation_level=None)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created REAL NOT NULL,"
+                " accessed REAL NOT NULL)")
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed)")
+            count = db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        except sqlite3.Error:
+            db.close()
+            raise
+        return db, count
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._db.execute(
+                    "SELECT value, created, accessed FROM entries WHERE key = ?",
+                    (key,)).fetchone()
+                if row is None:
+                    return None
+                value, created, accessed = row
+                if now - created > self.ttl:
+                    self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self._count -= 1
+                    return None
+                if now - accessed > _TOUCH_INTERVAL:
+                    self._db.execute("UPDATE entries SET accessed = ? WHERE key = ?",
+                                     (now, key))
+            except sqlite3.Error:
+                # Treated as a miss
+                return None
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            return None
+
+    def get_many(self, keys) -> Dict[str, Any]:
+        """Cached values for the keys that are present and unexpired."""
+        now = time.time()
+        keys = list(keys)
+        found: Dict[str, Any] = {}
+        touch = []
+        with self._lock:
+            try:
+                # Stay below SQLite's bound-parameter limit
+                for i in range(0, len(keys), 500):
+                    chunk = keys[i:i + 500]
+                    rows = self._db.execute(
+                        "SELECT key, value, created, accessed FROM entries WHERE key IN"
+                        f" ({','.join('?' * len(chunk))})", chunk).fetchall()
+                    for key, value, created, accessed in rows:
+                        if now - created > self.ttl:
+                            continue
+                        try:
+                            found[key] = json.loads(value)
+                        except json.JSONDecodeError:
+                            continue
+                        if now - accessed > _TOUCH_INTERVAL:
+                            touch.append((now, key))
+                if touch:
+                    self._db.executemany("UPDATE entries SET accessed = ? WHERE key = ?", touch)
+            except sqlite3.Error:
+                # Keys not read yet are misses
+                pass
+        return found
+
+    def put(self, key: str, value: Any):
+        """Store a value, evicting least recently used entries over the cap."""
+        now = time.time()
+        data = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            try:
+                cur = self._db.execute(
+                    "UPDATE entries SET value = ?, created = ?, accessed = ? WHERE key = ?",
+                    (data, now, now, key))
+                if cur.rowcount == 0:
+                    self._db.execute(
+                        "INSERT INTO entries (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                        (key, data, now, now))
+                    self._count += 1
+                if self._count > self.max_entries:
+                    self._evict(self._count - self.max_entries)
+            except sqlite3.Error:
+                # The value is simply not cached
+                pass
+
+    def _evict(self, n: int):
+        cur = self._db.execute(
+            "DELETE FROM entries WHERE key IN"
+            " (SELECT key FROM entries ORDER BY accessed LIMIT ?)", (n,))
+        self._count -= max(cur.rowcount, 0)
+
+    def update(self, entries: dict):
+        """Store many values in one transaction."""
+        self._insert_many(entries, replace=True)
+
+    def _insert_many(self, entries: dict, replace: bool):
+        now = time.time()
+        rows = [(k, json.dumps(v, ensure_ascii=False), now, now)
+                for k, v in entries.items()]
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        with self._lock:
+            try:
+                self._db.execute("BEGIN")
+                self._db.executemany(
+                    f"{verb} INTO entries (key, value, created, accessed)"
+                    " VALUES (?, ?, ?, ?)", rows)
+                self._db.execute("COMMIT")
+                self._count = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+                if self._count > self.max_entries:
+                    self._evict(self._count - self.max_entries)
+            except sqlite3.Error:
+                if self._db.in_transaction:
+                    try:
+                        self._db.execute("ROLLBACK")
+                    except sqlite3.Error:
+                        pass
+
+    def items(self) -> list:
+        """All unexpired (key, value) pairs."""
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            try:
+                rows = self._db.execute(
+                    "SELECT key, value FROM entries WHERE created >= ?", (cutoff,)).fetchall()
+            except sqlite3.Error:
+                rows = []
+        result = []
+        for key, value in rows:
+            try:
+                result.append((key, json.loads(value)))
+            except json.JSONDecodeError:
+                continue
+        return result
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def clear(self):
+        with self._lock:
+            try:
+                self._db.execute("DELETE FROM entries")
+                self._count = 0
+            except sqlite3.Error:
+                pass
+
+    def import_json(self, json_path) -> int:
+        """Migrate a legacy single-file JSON cache; returns entries imported."""
+        try:
+            data = json.loads(Path(json_path).read_text())
+        except (json.JSONDecodeError, OSError):
+            return 0
+        if not isinstance(data, dict):
+            return 0
+        self._insert_many(data, replace=False)
+        return len(data)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_TRAILER = b"IEND\xaeB`\x82"
+
+
+def valid_png(head: bytes, tail: bytes, size: int) -> bool:
+    """Cheap integrity check: PNG signature up front, IEND chunk at the end."""
+    return (size >= len(PNG_SIGNATURE) + len(PNG_TRAILER)
+            and head.startswith(PNG_SIGNATURE) and tail.endswith(PNG_TRAILER))
+
+
+def valid_wav(head: bytes, tail: bytes, size: int) -> bool:
+    """RIFF/WAVE header and at least one sample frame."""
+    return size > 44 and head[:4] == b"RIFF" and head[8:12] == b"WAVE"
+
+
+class FileCache:
+    """Directory of cached files with a byte budget and LRU eviction.
+
+    Only files whose names match ``pattern`` are managed, so the cache
+    can share a directory with other data. Recency is tracked through
+    the file mtime, which is refreshed at most hourly on access.
+    """
+
+    def __init__(self, directory, max_bytes: int, pattern: str = r".+",
+                 validator: Optional[Callable[[bytes, bytes, int], bool]] = None):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._pattern = re.compile(pattern)
+        self._validator = validator
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, Tuple[int, float]]] = None  # name → (size, used)
+        self._verified: set = set()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _scan(self):
+        """Build the index on first use (one directory listing)."""
+        if self._index is not None:
+            return
+        index = {}
+        total = 0
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError:
+            entries = []
+        for entry in entries:
+            if entry.name.startswith(".tmp-"):
+                # Left behind by an interrupted write
+                try:
+                    if time.time() - entry.stat().st_mtime > _TOUCH_INTERVAL:
+                        os.unlink(entry.path)
+                except OSError:
+                    pass
+                continue
+            if not self._pattern.fullmatch(entry.name):
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            index[entry.name] = (st.st_size, st.st_mtime)
+            total += st.st_size
+        self._index = index
+        self._bytes = total
+
+    def _check(self, name: str, path: Path, size: int) -> bool:
+        """Validate a file once per session (reads only its head and tail)."""
+        if self._validator is None or name in self._verified:
+            return True
+        try:
+            with open(path, "rb") as f:
+                head = f.read(16)
+                f.seek(max(0, size - 16))
+                tail = f.read(16)
+        except OSError:
+            return False
+        if not self._validator(head, tail, size):
+            return False
+        self._verified.add(name)
+        return True
+
+    def _drop(self, name: str):
+        size, _used = self._index.pop(name, (0, 0.0))
+        self._bytes -= size
+        self._verified.discard(name)
+        try:
+            (self.directory / name).unlink()
+        except OSError:
+            pass
+
+    def contains(self, name: str) -> bool:
+        """Whether a valid copy is cached, without counting a hit."""
+        with self._lock:
+            self._scan()
+            entry = self._index.get(name)
+            if entry is None:
+                return False
+            if not self._check(name, self.directory / name, entry[0]):
+                self._drop(name)
+                return False
+            return True
+
+    def get(self, name: str) -> Optional[Path]:
+        """Path of a cached file, or None (corrupt files are dropped)."""
+        path = self.directory / name
+        with self._lock:
+            self._scan()
+            entry = self._index.get(name)
+            if entry is not None and not self._check(name, path, entry[0]):
+                self._drop(name)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            size, used = entry
+            now = time.time()
+            if now - used > _TOUCH_INTERVAL:
+                self._index[name] = (size, now)
+                try:
+                    os.utime(path, (now, now))
+                except OSError:
+                    pass
+            return path
+
+    def put(self, name: str, data: bytes) -> Optional[Path]:
+        """Atomically store a file; returns None if it fails validation."""
+        if not self._pattern.fullmatch(name):
+            raise ValueError(f"{name!r} does not belong in this cache")
+        if self._validator is not None and not self._validator(data[:16], data[-16:], len(data)):
+            return None
+        path = self.directory / name
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            return None
+        with self._lock:
+            self._scan()
+            old_size, _used = self._index.get(name, (0, 0.0))
+            self._index[name] = (len(data), time.time())
+            self._bytes += len(data) - old_size
+            self._verified.add(name)
+            self._evict()
+        return path
+
+    def _evict(self):
+        if self._bytes <= self.max_bytes:
+            return
+        for name, _entry in sorted(self._index.items(), key=lambda item: item[1][1]):
+            if self._bytes <= self.max_bytes:
+                break
+            self._drop(name)
+            self.evictions += 1
+
+    def names(self) -> list:
+        with self._lock:
+            self._scan()
+            return list(self._index)
+
+    def set_max_bytes(self, max_bytes: int):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._scan()
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._scan()
+            for name in list(self._index):
+                self._drop(name)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._scan()
+            return {"hits": self.hits, "misses": self.misses,
+                    "bytes": self._bytes, "files": len(self._index),
+                    "evictions": self.evictions, "max_bytes": self.max_bytes}
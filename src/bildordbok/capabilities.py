@@ -0,0 +1,138 @@
+"""What speech tools this machine has, probed once and shared.
+
+Finding espeak-ng, Piper, an audio player and the installed Piper
+voices means PATH lookups and directory listings. The registry does
+them once and hands out an immutable snapshot. The snapshot is
+re-probed when ``refresh()`` is called, or when the modification time
+of a voice directory changes (checked at most every few seconds), so
+installing a voice is picked up without a restart.
+
+Usage:
+    caps = get_capabilities()
+    if caps.espeak:
+        ...
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+PLAYERS = ["aplay", "paplay", "pw-play", "ffplay"]
+# Seconds between voice directory mtime checks
+CHECK_INTERVAL = 5.0
+
+
+def voice_dirs() -> List[Path]:
+    """Directories searched for Piper voices, in order of preference."""
+    dirs = [
+        Path.home() / ".local" / "share" / "piper-voices",
+        Path("/usr/share/piper-voices"),
+        Path("/usr/local/share/piper-voices"),
+        Path.home() / ".local" / "share" / "piper" / "voices",
+    ]
+    xdg = os.environ.get("XDG_DATA_HOME")
+    if xdg:
+        dirs.insert(0, Path(xdg) / "piper-voices")
+    return dirs
+
+
+@dataclass(frozen=True)
+class Capabilities:
+    piper: Optional[str] = None
+    espeak: Optional[str] = None
+    players: Dict[str, str] = field(default_factory=dict)   # name → path
+    voices: Dict[Path, Tuple[str, ...]] = field(default_factory=dict)  # dir → model names
+
+    @property
+    def voice_dir(self) -> Optional[Path]:
+        """First directory holding any Piper voice."""
+        return next(iter(self.voices), None)
+
+    def find_voice(self, prefix: str) -> Optional[Path]:
+        """Model path of the first voice whose name starts with prefix."""
+        for directory, names in self.voices.items():
+            for name in names:
+                if name.startswith(prefix):
+                    return directory / f"{name}.onnx"
+        return None
+
+
+def _mtime(path: Path) -> Optional[float]:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return None
+
+
+class CapabilityRegistry:
+    """Thread-safe, lazily probed Capabilities."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._caps: Optional[Capabilities] = None
+        self._mtimes: Dict[Path, Optional[float]] = {}
+        self._checked = 0.0
+
+    def get(self) -> Capabilities:
+        with self._lock:
+            if self._caps is None or self._voices_changed():
+                self._caps = self._probe()
+            return self._caps
+
+    def refresh(self) -> Capabilities:
+        """Probe again now (e.g. after installing espeak-ng)."""
+        with self._lock:
+            self._caps = self._probe()
+            return self._caps
+
+    def _voices_changed(self) -> bool:
+        now = time.monotonic()
+        if now - self._checked < CHECK_INTERVAL:
+            return False
+        self._checked = now
+        return any(_mtime(d) != m for d, m in self._mtimes.items())
+
+    def _probe(self) -> Capabilities:
+        dirs = voice_dirs()
+        self._mtimes = {d: _mtime(d) for d in dirs}
+        self._checked = time.monotonic()
+        voices = {}
+        for d in dirs:
+            if self._mtimes[d] is None:
+                continue
+            try:
+                names = tuple(sorted(p.stem for p in d.glob("*.onnx")))
+            except OSError:
+                continue
+            if names:
+                voices[d] = names
+        players = {}
+        for name in PLAYERS:
+            exe = shutil.which(name)
+            if exe:
+                players[name] = exe
+        return Capabilities(
+            piper=shutil.which("piper"),
+            espeak=shutil.which("espeak-ng") or shutil.which("espeak"),
+            players=players,
+            voices=voices,
+        )
+
+
+_registry = CapabilityRegistry()
+
+
+def get_capabilities() -> Capabilities:
+    """Current capabilities, probed on first use."""
+    return _registry.get()
+
+
+def refresh() -> Capabilities:
+    """Forget cached capabilities and probe again."""
+    return _registry.refresh()
@@ -3,6 +3,9 @@
 import csv
 import io
 import json
+import os
+import tempfile
+import threading
 from datetime import datetime
 
 import gettext
@@ -17,7 +20,7 @@ WEBSITE = "www.autismappar.se"
 import gi
 gi.require_version('Gtk', '4.0')
 gi.require_version('Adw', '1')
-from gi.repository import Gtk, Adw, Gio, GLib
+from gi.repository import Gtk, Adw, GLib
 
 
 def words_to_csv(words):
@@ -47,83 +50,231 @@ def words_to_json(words):
     return json.dumps(data, indent=2, ensure_ascii=False)
 
 
-def words_to_pdf(words, output_path):
-    """Export word list as A4 PDF."""
+# A4 in points
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+ROW_HEIGHT = 28
+PICTO_SIZE = 24   # points
+PICTO_PIXELS = 48  # pictograms are embedded at twice their printed size
+
+
+def _load_cairo():
     try:
         import cairo
     except ImportError:
         try:
             import cairocffi as cairo
         except ImportError:
+            return None
+    return cairo
+
+
+class PdfExportJob:
+    """Render a word list to PDF on a worker thread, a page at a time.
+
+    The rows are copied when the job is created, so the word list may
+    change while it runs. on_progress(done, total) and on_done(ok, error)
+    are called on the GTK main loop; a cancelled job reports ok=False
+    with no error. Output goes to a temporary file that replaces
+    output_path only once the document is complete.
+
+    With pictograms=True, words whose pictogram is already cached are
+    drawn with it instead of the emoji. Nothing is downloaded, and each
+    pictogram is decoded and scaled once, then reused as the same cairo
+    surface so the PDF holds one copy of it.
+    """
+
+    def __init__(self, words, output_path, pictograms=False,
+                 on_progress=None, on_done=None):
+        self.rows = [(w.emoji, w.sv, w.en, w.category) for w in words]
+        self.output_path = output_path
+        self.pictograms = pictograms
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.cancelled = False
+        self.error = None
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run_async, daemon=True,
+                                        name="pdf-export")
+        self._thread.start()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def _run_async(self):
+        ok = False
+        try:
+            ok = self.run()
+        except Exception as e:
+            self.error = _("Export error: %s") % str(e)
+        finally:
+            # The progress dialog stays open until this arrives
+            if self.on_done:
+                GLib.idle_add(self._deliver_done, ok)
+
+    def _deliver_done(self, ok):
+        self.on_done(ok, self.error)
+        return False
+
+    def _report(self, done):
+        if self.on_progress:
+            GLib.idle_add(self._deliver_progress, done)
+
+    def _deliver_progress(self, done):
+        if not self.cancelled:
+            self.on_progress(done, len(self.rows))
+        return False
+
+    def run(self):
+        """Render synchronously; True once output_path is written.
+
+        Never raises: failures are left in self.error.
+        """
+        cairo = _load_cairo()
+        if cairo is None:
+            self.error = _("PDF export requires pycairo")
             return False
-
-    width, height = 595, 842
-    surface = cairo.PDFSurface(output_path, width, height)
-    ctx = cairo.Context(surface)
-
-    ctx.set_font_size(24)
-    ctx.move_to(40, 50)
-    ctx.show_text(_("Picture Dictionary"))
-
-    ctx.set_font_size(12)
-    ctx.set_source_rgb(0.5, 0.5, 0.5)
-    ctx.move_to(40, 70)
-    ctx.show_text(f"{len(words)} " + _("words") + f" — {datetime.now().strftime('%Y-%m-%d')}")
-    ctx.set_source_rgb(0, 0, 0)
-
-    # Table header
-    y = 100
-    ctx.set_font_size(12)
-    ctx.set_source_rgb(0.3, 0.3, 0.3)
-    ctx.move_to(40, y)
-    ctx.show_text("")
-    ctx.move_to(70, y)
-    ctx.show_text(_("Swedish"))
-    ctx.move_to(250, y)
-    ctx.show_text(_("English"))
-    ctx.move_to(430, y)
-    ctx.show_text(_("Category"))
-    ctx.set_source_rgb(0, 0, 0)
-    y += 20
-
-    row_h = 28
-    ctx.set_font_size(14)
-    for w in words:
-        if y + row_h > height - 40:
-            surface.show_page()
-            y = 40
-
-        ctx.move_to(40, y + 18)
-        ctx.show_text(w.emoji)
-        ctx.move_to(70, y + 18)
-        ctx.show_text(w.sv.capitalize())
-        ctx.set_source_rgb(0.4, 0.4, 0.4)
-        ctx.move_to(250, y + 18)
-        ctx.show_text(w.en.capitalize())
-        ctx.set_font_size(11)
-        ctx.move_to(430, y + 18)
-        ctx.show_text(w.category)
-        ctx.set_font_size(14)
+        tmp = None
+        try:
+            if not self.output_path:
+                # e.g. a save location without a local path
+                raise OSError(_("the chosen location has no local path"))
+            directory = os.path.dirname(os.path.abspath(self.output_path))
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".pdf")
+            os.close(fd)
+            if self._render(cairo, tmp):
+                os.replace(tmp, self.output_path)
+                return True
+        except Exception as e:
+            self.error = _("Export error: %s") % str(e)
+        if tmp is not None:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+        return False
+
+    def _pictogram_ids(self):
+        if not self.pictograms:
+            return {}
+        from bildordbok import arasaac
+        try:
+            return arasaac.get_provider().cached_ids(r[2] for r in self.rows)
+        except Exception:
+            return {}
+
+    def _surface(self, cairo, surfaces, picto_id):
+        """Scaled surface for a pictogram, decoded on first use."""
+        if picto_id in surfaces:
+            return surfaces[picto_id]
+        from bildordbok import arasaac
+        surface = None
+        path = arasaac.get_provider().cached_image_path(picto_id)
+        if path:
+            try:
+                image = cairo.ImageSurface.create_from_png(path)
+                surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, PICTO_PIXELS, PICTO_PIXELS)
+                ctx = cairo.Context(surface)
+                ctx.scale(PICTO_PIXELS / image.get_width(), PICTO_PIXELS / image.get_height())
+                ctx.set_source_surface(image, 0, 0)
+                ctx.paint()
+                surface.flush()
+            except (cairo.Error, MemoryError, OSError, ZeroDivisionError):
+                surface = None
+        surfaces[picto_id] = surface
+        return surface
+
+    def _render(self, cairo, path):
+        width, height = PAGE_WIDTH, PAGE_HEIGHT
+        today = datetime.now().strftime('%Y-%m-%d')
+        ids = self._pictogram_ids()
+        surfaces = {}
+        surface = cairo.PDFSurface(path, width, height)
+        ctx = cairo.Context(surface)
+
+        ctx.set_font_size(24)
+        ctx.move_to(40, 50)
+        ctx.show_text(_("Picture Dictionary"))
+
+        ctx.set_font_size(12)
+        ctx.set_source_rgb(0.5, 0.5, 0.5)
+        ctx.move_to(40, 70)
+        ctx.show_text(f"{len(self.rows)} " + _("words") + f" — {today}")
         ctx.set_source_rgb(0, 0, 0)
 
-        # Line
-        ctx.set_source_rgb(0.9, 0.9, 0.9)
-        ctx.set_line_width(0.3)
-        ctx.move_to(40, y + row_h - 2)
-        ctx.line_to(width - 40, y + row_h - 2)
-        ctx.stroke()
+        # Table header
+        y = 100
+        ctx.set_font_size(12)
+        ctx.set_source_rgb(0.3, 0.3, 0.3)
+        ctx.move_to(70, y)
+        ctx.show_text(_("Swedish"))
+        ctx.move_to(250, y)
+        ctx.show_text(_("English"))
+        ctx.move_to(430, y)
+        ctx.show_text(_("Category"))
         ctx.set_source_rgb(0, 0, 0)
+        y += 20
 
-        y += row_h
-
-    # Footer
-    ctx.set_font_size(9)
-    ctx.set_source_rgb(0.5, 0.5, 0.5)
-    ctx.move_to(40, height - 20)
-    ctx.show_text(f"{APP_LABEL} v{__version__} — {WEBSITE} — {datetime.now().strftime('%Y-%m-%d')}")
-
-    surface.finish()
-    return True
+        row_h = ROW_HEIGHT
+        ctx.set_font_size(14)
+        for i, (emoji, sv, en, category) in enumerate(self.rows):
+            if y + row_h > height - 40:
+                surface.show_page()
+                # Check and report once per page
+                if self.cancelled:
+                    surface.finish()
+                    return False
+                self._report(i)
+                y = 40
+
+            picto_id = ids.get(en.lower().strip())
+            picto = self._surface(cairo, surfaces, picto_id) if picto_id is not None else None
+            if picto is not None:
+                ctx.save()
+                ctx.translate(40, y + 1)
+                ctx.scale(PICTO_SIZE / PICTO_PIXELS, PICTO_SIZE / PICTO_PIXELS)
+                ctx.set_source_surface(picto, 0, 0)
+                ctx.paint()
+                ctx.restore()
+            else:
+                ctx.move_to(40, y + 18)
+                ctx.show_text(emoji)
+            ctx.move_to(70, y + 18)
+            ctx.show_text(sv.capitalize())
+            ctx.set_source_rgb(0.4, 0.4, 0.4)
+            ctx.move_to(250, y + 18)
+            ctx.show_text(en.capitalize())
+            ctx.set_font_size(11)
+            ctx.move_to(430, y + 18)
+            ctx.show_text(category)
+            ctx.set_font_size(14)
+            ctx.set_source_rgb(0, 0, 0)
+
+            # Line
+            ctx.set_source_rgb(0.9, 0.9, 0.9)
+            ctx.set_line_width(0.3)
+            ctx.move_to(40, y + row_h - 2)
+            ctx.line_to(width - 40, y + row_h - 2)
+            ctx.stroke()
+            ctx.set_source_rgb(0, 0, 0)
+
+            y += row_h
+
+        # Footer
+        ctx.set_font_size(9)
+        ctx.set_source_rgb(0.5, 0.5, 0.5)
+        ctx.move_to(40, height - 20)
+        ctx.show_text(f"{APP_LABEL} v{__version__} — {WEBSITE} — {today}")
+
+        surface.finish()
+        self._report(len(self.rows))
+        return not self.cancelled
+
+
+def words_to_pdf(words, output_path, pictograms=False):
+    """Export word list as A4 PDF (blocking; see PdfExportJob)."""
+    return PdfExportJob(words, output_path, pictograms=pictograms).run()
 
 
 def show_export_dialog(window, words, status_callback=None):
@@ -138,11 +289,15 @@ def show_export_dialog(window, words, status_callback=None):
     dialog.add_response("pdf", _("PDF"))
     dialog.set_default_response("pdf")
     dialog.set_close_response("cancel")
-    dialog.connect("response", _on_export_response, window, words, status_callback)
+    pictograms = Gtk.CheckButton(label=_("Include downloaded pictograms in PDF"))
+    pictograms.set_active(True)
+    dialog.set_extra_child(pictograms)
+    dialog.connect("response", _on_export_response, window, words, status_callback,
+                   pictograms)
     dialog.present(window)
 
 
-def _on_export_response(dialog, response, window, words, status_callback):
+def _on_export_response(dialog, response, window, words, status_callback, pictograms):
     if response == "cancel":
         return
     converters = {"csv": words_to_csv, "json": words_to_json}
@@ -150,7 +305,7 @@ def _on_export_response(dialog, response, window, words, status_callback):
         content = converters[response](words)
         _save_text(window, content, response, status_callback)
     elif response == "pdf":
-        _save_pdf(window, words, status_callback)
+        _save_pdf(window, words, status_callback, pictograms.get_active())
 
 
 def _save_text(window, content, ext, status_callback):
@@ -175,24 +330,43 @@ def _on_text_done(fd, result, content, ext, status_callback):
             status_callback(_("Export error: %s") % str(e))
 
 
-def _save_pdf(window, words, status_callback):
+def _save_pdf(window, words, status_callback, pictograms):
     fd = Gtk.FileDialog.new()
     fd.set_title(_("Save PDF"))
     fd.set_initial_name(f"bildordbok_{datetime.now().strftime('%Y%m%d')}.pdf")
-    fd.save(window, None, _on_pdf_done, words, status_callback)
+    fd.save(window, None, _on_pdf_done, window, words, status_callback, pictograms)
 
 
-def _on_pdf_done(fd, result, words, status_callback):
+def _on_pdf_done(fd, result, window, words, status_callback, pictograms):
     try:
         gfile = fd.save_finish(result)
     except GLib.Error:
         return
-    try:
-        ok = words_to_pdf(words, gfile.get_path())
-        if ok and status_callback:
+
+    progress = Gtk.ProgressBar(show_text=True)
+    dialog = Adw.AlertDialog.new(_("Exporting PDF"), None)
+    dialog.add_response("cancel", _("Cancel"))
+    dialog.set_close_response("cancel")
+    dialog.set_extra_child(progress)
+
+    def on_progress(done, total):
+        progress.set_fraction(done / total if total else 1.0)
+        progress.set_text(_("%d of %d words") % (done, total))
+
+    def on_done(ok, error):
+        dialog.force_close()
+        if not status_callback:
+            return
+        if ok:
             status_callback(_("PDF exported"))
-        elif not ok and status_callback:
-            status_callback(_("PDF export requires pycairo"))
-    except Exception as e:
-        if status_callback:
-            status_callback(_("Export error: %s") % str(e))
+        elif error:
+            status_callback(error)
+        else:
+            status_callback(_("PDF export cancelled"))
+
+    job = PdfExportJob(words, gfile.get_path(), pictograms=pictograms,
+                       on_progress=on_progress, on_done=on_done)
+    dialog.connect("response", lambda *_args: job.cancel())
+    on_progress(0, len(job.rows))
+    dialog.present(window)
+    job.start()
@@ -0,0 +1,197 @@
+"""Small keep-alive HTTP client used for ARASAAC requests.
+
+urllib opens a new TCP (and TLS) connection for every request. HTTPPool
+keeps idle ``http.client`` connections per host and reuses them, caps
+the number of concurrent requests per host, and retries throttled
+requests (429/503) after their Retry-After delay or an exponential
+backoff. Redirects are followed as urllib would, up to MAX_REDIRECTS
+hops, as long as they keep the scheme.
+
+Usage:
+    body = get_pool().get("https://api.arasaac.org/v1/...", timeout=10)
+"""
+
+from __future__ import annotations
+
+import email.utils
+import http.client
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.error import URLError
+from urllib.parse import urljoin, urlsplit
+
+USER_AGENT = "Bildordbok-Swedish-Ordlista/1.0"
+MAX_PER_HOST = 4
+MAX_IDLE_PER_HOST = 4
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5    # seconds, doubled per attempt
+MAX_RETRY_AFTER = 30  # seconds; longer server hints are not honored
+MAX_REDIRECTS = 5
+
+_RETRY_STATUSES = (429, 503)
+_REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+_HostKey = Tuple[str, str]  # (scheme, netloc)
+
+
+class PoolError(URLError):
+    """A request through the pool failed (network error or HTTP status)."""
+
+    def __init__(self, reason, status: Optional[int] = None):
+        super().__init__(reason)
+        self.status = status
+
+
+class HTTPPool:
+    """Per-host pool of persistent HTTP connections."""
+
+    def __init__(self, max_per_host: int = MAX_PER_HOST,
+                 max_retries: int = MAX_RETRIES, user_agent: str = USER_AGENT):
+        self.max_per_host = max_per_host
+        self.max_retries = max_retries
+        self.user_agent = user_agent
+        self._lock = threading.Lock()
+        self._idle: Dict[_HostKey, List[http.client.HTTPConnection]] = {}
+        self._slots: Dict[_HostKey, threading.BoundedSemaphore] = {}
+        self.connections_opened = 0
+
+    def _slot(self, key: _HostKey) -> threading.BoundedSemaphore:
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._slots[key] = threading.BoundedSemaphore(self.max_per_host)
+            return slot
+
+    def _connect(self, key: _HostKey, timeout: float) -> http.client.HTTPConnection:
+        with self._lock:
+            self.connections_opened += 1
+        scheme, netloc = key
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return cls(netloc, timeout=timeout)
+
+    def _checkout(self, key: _HostKey, timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+        """Return (connection, reused)."""
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                conn = idle.pop()
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+        return self._connect(key, timeout), False
+
+    def _checkin(self, key: _HostKey, conn: http.client.HTTPConnection):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < MAX_IDLE_PER_HOST:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def _request_once(self, key: _HostKey, path: str, headers: dict,
+                      timeout: float) -> Tuple[int, dict, bytes]:
+        conn, reused = self._checkout(key, timeout)
+        try:
+            try:
+                conn.request("GET", path, headers=headers)
+                resp = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError,
+                    BrokenPipeError, http.client.CannotSendRequest):
+                if not reused:
+                    raise
+                # The server closed an idle keep-alive connection; retry fresh
+                conn.close()
+                conn = self._connect(key, timeout)
+                conn.request("GET", path, headers=headers)
+                resp = conn.getresponse()
+            body = resp.read()
+        except Exception:
+            conn.close()
+            raise
+        if resp.will_close:
+            conn.close()
+        else:
+            self._checkin(key, conn)
+        return resp.status, dict(resp.getheaders()), body
+
+    def get(self, url: str, headers: Optional[dict] = None, timeout: float = 10) -> bytes:
+        """GET a URL and return the body; raises PoolError on failure."""
+        for _hop in range(MAX_REDIRECTS + 1):
+            status, resp_headers, body = self._fetch(url, headers, timeout)
+            if status not in _REDIRECT_STATUSES:
+                return body
+            location = next((v for k, v in resp_headers.items() if k.lower() == "location"), None)
+            if not location:
+                raise PoolError(f"HTTP {status} without Location for {url}", status=status)
+            target = urljoin(url, location)
+            if urlsplit(target).scheme != urlsplit(url).scheme:
+                raise PoolError(f"Redirect from {url} to another scheme", status=status)
+            url = target
+        raise PoolError(f"Too many redirects for {url}")
+
+    def _fetch(self, url: str, headers: Optional[dict],
+               timeout: float) -> Tuple[int, dict, bytes]:
+        """One URL, retrying throttled requests; 2xx and redirects are returned."""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        req_headers = {"User-Agent": self.user_agent, "Connection": "keep-alive"}
+        if headers:
+            req_headers.update(headers)
+
+        slot = self._slot(key)
+        for attempt in range(self.max_retries + 1):
+            with slot:
+                try:
+                    status, resp_headers, body = self._request_once(
+                        key, path, req_headers, timeout)
+                except (OSError, http.client.HTTPException) as e:
+                    raise PoolError(e) from e
+            if 200 <= status < 300 or status in _REDIRECT_STATUSES:
+                return status, resp_headers, body
+            if status in _RETRY_STATUSES and attempt < self.max_retries:
+                time.sleep(_retry_delay(resp_headers, attempt))
+                continue
+            raise PoolError(f"HTTP {status} for {url}", status=status)
+        raise PoolError(f"Gave up on {url}")
+
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+
+def _retry_delay(headers: dict, attempt: int) -> float:
+    """Seconds to wait before retrying a throttled request."""
+    value = next((v for k, v in headers.items() if k.lower() == "retry-after"), None)
+    if value:
+        try:
+            return min(MAX_RETRY_AFTER, max(0.0, float(value)))
+        except ValueError:
+            try:
+                parsed = email.utils.parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                parsed = None
+            if parsed is not None:
+                return min(MAX_RETRY_AFTER, max(0.0, parsed.timestamp() - time.time()))
+    return BACKOFF_BASE * (2 ** attempt)
+
+
+_default_pool: Optional[HTTPPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> HTTPPool:
+    """Get or create the shared HTTP pool."""
+    global _default_pool
+    with _pool_lock:
+        if _default_pool is None:
+            _default_pool = HTTPPool()
+        return _default_pool
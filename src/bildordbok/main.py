@@ -11,23 +11,40 @@ import gi
 gi.require_version("Gtk", "4.0")
 gi.require_version("Adw", "1")
 
-from gi.repository import Gtk, Adw, Gio, GLib, Pango, GdkPixbuf  # noqa: E402
+from gi.repository import Gtk, Adw, Gio, GLib, GObject, Pango  # noqa: E402
 
 from bildordbok.words import WordDatabase, WordEntry, CATEGORIES  # noqa: E402
-from bildordbok.tts import speak  # noqa: E402
+from bildordbok import tts  # noqa: E402
+from bildordbok.tts import get_audio_cache, speak, warm_up  # noqa: E402
 from bildordbok import __version__, _  # noqa: E402
 from bildordbok import arasaac  # noqa: E402
+from bildordbok import capabilities  # noqa: E402
+from bildordbok.pictogram_loader import get_loader  # noqa: E402
+from bildordbok.search_controller import SearchController  # noqa: E402
 from bildordbok.accessibility import apply_large_text
 from bildordbok.accessibility import AccessibilityManager
 
 APP_ID = "se.danielnylander.Bildordbok"
 
+class WordItem(GObject.Object):
+    """List model item wrapping a WordEntry for the word grids."""
+
+    def __init__(self, word: WordEntry):
+        super().__init__()
+        self.word = word
+
+
 class WordCard(Gtk.Box):
-    """A card showing a word with emoji, text in both languages and TTS buttons."""
+    """A card showing a word with emoji, text in both languages and TTS buttons.
 
-    def __init__(self, word: WordEntry, on_speak=None):
+    Cards are recycled by the word grids: bind() shows a new word in an
+    existing card and unbind() drops its pending pictogram load.
+    """
+
+    def __init__(self, word: WordEntry | None = None, on_speak=None):
         super().__init__(orientation=Gtk.Orientation.VERTICAL, spacing=8)
-        self.word = word
+        self.word = None
+        self._picto_request = None
         self.set_halign(Gtk.Align.CENTER)
         self.set_valign(Gtk.Align.CENTER)
         self.add_css_class("card")
@@ -37,53 +54,95 @@ class WordCard(Gtk.Box):
         self.set_margin_start(8)
         self.set_margin_end(8)
 
-        # Try ARASAAC pictogram, fall back to emoji
-        icon_widget = None
-        try:
-            provider = arasaac.get_provider()
-            path = provider.get_pictogram(word.en, lang="en", resolution=128)
-            if path:
-                pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(
-                    path, 96, 96, True)
-                icon_widget = Gtk.Image.new_from_pixbuf(pixbuf)
-                icon_widget.set_pixel_size(96)
-        except Exception:
-            pass
-        if icon_widget is None:
-            icon_widget = Gtk.Label(label=word.emoji)
-            icon_widget.add_css_class("title-1")
-            icon_widget.set_markup(f'<span size="72000">{word.emoji}</span>')
-        self.append(icon_widget)
+        # Emoji placeholder; the ARASAAC pictogram is swapped in when loaded
+        self.icon_stack = Gtk.Stack()
+        self.emoji_label = Gtk.Label()
+        self.emoji_label.add_css_class("title-1")
+        self.icon_stack.add_named(self.emoji_label, "emoji")
+        self.picto_image = Gtk.Image()
+        self.picto_image.set_pixel_size(96)
+        self.icon_stack.add_named(self.picto_image, "pictogram")
+        self.append(self.icon_stack)
 
         # Swedish word
         sv_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=4)
         sv_box.set_halign(Gtk.Align.CENTER)
-        sv_label = Gtk.Label(label=word.sv.capitalize())
-        sv_label.add_css_class("title-3")
-        sv_box.append(sv_label)
+        self.sv_label = Gtk.Label()
+        self.sv_label.add_css_class("title-3")
+        sv_box.append(self.sv_label)
         sv_btn = Gtk.Button(icon_name="audio-speakers-symbolic")
         sv_btn.add_css_class("flat")
         sv_btn.add_css_class("circular")
         sv_btn.set_tooltip_text(_("Listen (Swedish)"))
-        sv_btn.connect("clicked", lambda _: speak(word.sv, "sv"))
+        sv_btn.connect("clicked", lambda _: self.word and speak(self.word.sv, "sv"))
         sv_box.append(sv_btn)
         self.append(sv_box)
 
         # English word
         en_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=4)
         en_box.set_halign(Gtk.Align.CENTER)
-        en_label = Gtk.Label(label=word.en.capitalize())
-        en_label.add_css_class("body")
-        en_label.set_opacity(0.7)
-        en_box.append(en_label)
+        self.en_label = Gtk.Label()
+        self.en_label.add_css_class("body")
+        self.en_label.set_opacity(0.7)
+        en_box.append(self.en_label)
         en_btn = Gtk.Button(icon_name="audio-speakers-symbolic")
         en_btn.add_css_class("flat")
         en_btn.add_css_class("circular")
         en_btn.set_tooltip_text(_("Listen (English)"))
-        en_btn.connect("clicked", lambda _: speak(word.en, "en"))
+        en_btn.connect("clicked", lambda _: self.word and speak(self.word.en, "en"))
         en_box.append(en_btn)
         self.append(en_box)
 
+        if word is not None:
+            self.bind(word)
+
+    def bind(self, word: WordEntry):
+        """Show a word in this card and start loading its pictogram."""
+        self.unbind()
+        self.word = word
+        self.emoji_label.set_markup(f'<span size="72000">{word.emoji}</span>')
+        self.icon_stack.set_visible_child_name("emoji")
+        self.sv_label.set_label(word.sv.capitalize())
+        self.en_label.set_label(word.en.capitalize())
+        self._picto_request = get_loader().request(word.en, self.set_pictogram)
+
+    def unbind(self):
+        """Forget the current word; a pending pictogram is never shown."""
+        if self._picto_request is not None:
+            self._picto_request.cancel()
+            self._picto_request = None
+        self.word = None
+
+    def set_pictogram(self, texture):
+        """Replace the emoji placeholder with a decoded pictogram."""
+        self.picto_image.set_from_paintable(texture)
+        self.icon_stack.set_visible_child_name("pictogram")
+
+
+def _make_word_grid():
+    """Build a recycling word grid; returns (scrolled window, list store)."""
+    store = Gio.ListStore(item_type=WordItem)
+    factory = Gtk.SignalListItemFactory()
+    factory.connect("setup", lambda _f, item: item.set_child(WordCard()))
+    factory.connect("bind", lambda _f, item: item.get_child().bind(item.get_item().word))
+    factory.connect("unbind", lambda _f, item: item.get_child().unbind())
+    grid = Gtk.GridView(model=Gtk.NoSelection(model=store), factory=factory)
+    grid.set_max_columns(5)
+    grid.set_min_columns(2)
+    grid.set_margin_top(16)
+    grid.set_margin_bottom(16)
+    grid.set_margin_start(16)
+    grid.set_margin_end(16)
+    scroll = Gtk.ScrolledWindow()
+    scroll.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
+    scroll.set_child(grid)
+    return scroll, store
+
+
+def _show_words(store, words):
+    """Replace the contents of a word grid's store in one splice."""
+    store.splice(0, store.get_n_items(), [WordItem(w) for w in words])
+
 class FlashcardView(Gtk.Box):
     """Spaced repetition flashcard view."""
 
@@ -246,6 +305,8 @@ class BildordbokWindow(Adw.ApplicationWindow):
     def __init__(self, app):
         super().__init__(application=app, title=_("Picture Dictionary"), default_width=900, default_height=700)
         self.db = WordDatabase()
+        # Bumped on every category switch, so stale pack loads are ignored
+        self._category_request = 0
         self._dark = False
         # Easter egg state
         self._egg_clicks = 0
@@ -317,6 +378,9 @@ class BildordbokWindow(Adw.ApplicationWindow):
         self.search_entry = Gtk.SearchEntry()
         self.search_entry.set_hexpand(True)
         self.search_entry.set_placeholder_text(_("Search words..."))
+        # Debouncing is done by the search controller
+        self.search_entry.set_search_delay(0)
+        self.search_controller = SearchController(self.db, self._show_search_results)
         self.search_entry.connect("search-changed", self._on_search_changed)
         self.search_bar.set_child(self.search_entry)
         self.search_bar.connect_entry(self.search_entry)
@@ -331,22 +395,8 @@ class BildordbokWindow(Adw.ApplicationWindow):
         # Category view
         self._build_category_view()
 
-        # Words view (reused for different categories)
-        self.words_scroll = Gtk.ScrolledWindow()
-        self.words_scroll.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
-        self.words_flow = Gtk.FlowBox()
-        self.words_flow.set_valign(Gtk.Align.START)
-        self.words_flow.set_max_children_per_line(5)
-        self.words_flow.set_min_children_per_line(2)
-        self.words_flow.set_selection_mode(Gtk.SelectionMode.NONE)
-        self.words_flow.set_homogeneous(True)
-        self.words_flow.set_row_spacing(8)
-        self.words_flow.set_column_spacing(8)
-        self.words_flow.set_margin_top(16)
-        self.words_flow.set_margin_bottom(16)
-        self.words_flow.set_margin_start(16)
-        self.words_flow.set_margin_end(16)
-        self.words_scroll.set_child(self.words_flow)
+        # Words view (reused for different categories; cards are recycled)
+        self.words_scroll, self.words_store = _make_word_grid()
         self.stack.add_named(self.words_scroll, "words")
 
         # Flashcard view
@@ -354,25 +404,11 @@ class BildordbokWindow(Adw.ApplicationWindow):
         self.stack.add_named(self.flashcard_view, "flashcards")
 
         # Search results view
-        self.search_scroll = Gtk.ScrolledWindow()
-        self.search_scroll.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
-        self.search_flow = Gtk.FlowBox()
-        self.search_flow.set_valign(Gtk.Align.START)
-        self.search_flow.set_max_children_per_line(5)
-        self.search_flow.set_min_children_per_line(2)
-        self.search_flow.set_selection_mode(Gtk.SelectionMode.NONE)
-        self.search_flow.set_homogeneous(True)
-        self.search_flow.set_row_spacing(8)
-        self.search_flow.set_column_spacing(8)
-        self.search_flow.set_margin_top(16)
-        self.search_flow.set_margin_bottom(16)
-        self.search_flow.set_margin_start(16)
-        self.search_flow.set_margin_end(16)
-        self.search_scroll.set_child(self.search_flow)
+        self.search_scroll, self.search_store = _make_word_grid()
         self.stack.add_named(self.search_scroll, "search")
 
         # Status bar
-        self.statusbar = Gtk.Label(label=_("{count} words in dictionary").format(count=len(self.db.words)))
+        self.statusbar = Gtk.Label(label=_("{count} words in dictionary").format(count=self.db.word_count()))
         self.statusbar.add_css_class("dim-label")
         self.statusbar.set_margin_top(4)
         self.statusbar.set_margin_bottom(4)
@@ -427,7 +463,7 @@ class BildordbokWindow(Adw.ApplicationWindow):
             name.add_css_class("title-3")
             btn_box.append(name)
 
-            count = len(self.db.by_category(cat_id))
+            count = self.db.category_count(cat_id)
             count_label = Gtk.Label(label=_("{count} words").format(count=count))
             count_label.add_css_class("dim-label")
             btn_box.append(count_label)
@@ -445,25 +481,44 @@ class BildordbokWindow(Adw.ApplicationWindow):
         self.title_widget.set_subtitle(f"{cat_info['icon']} {cat_info['name']}")
         self.back_btn.set_visible(True)
 
-        # Clear and populate
-        while True:
-            child = self.words_flow.get_first_child()
-            if child is None:
-                break
-            self.words_flow.remove(child)
+        # Replace the model; only visible cards are built and bound
+        get_loader().cancel_all()
+        self._category_request += 1
+        self.stack.set_visible_child_name("words")
+        if not self.db.is_loaded(cat_id):
+            # Pack words are read from disk on a worker, not here
+            _show_words(self.words_store, [])
+            self.statusbar.set_text(_("Loading {category}…").format(category=cat_info["name"]))
+            request = self._category_request
+            self.db.load_in_background(
+                [cat_id], lambda: GLib.idle_add(self._on_category_loaded, request, cat_id))
+            return
+        self._show_category(cat_id)
 
-        for word in self.db.by_category(cat_id):
-            card = WordCard(word)
-            self.words_flow.append(card)
+    def _on_category_loaded(self, request, cat_id):
+        if request == self._category_request:
+            self._show_category(cat_id)
+        return False
 
-        self.stack.set_visible_child_name("words")
-        self.statusbar.set_text(_("{count} words in {category}").format(count=len(self.db.by_category(cat_id)), category=cat_info["name"]))
+    def _show_category(self, cat_id):
+        cat_info = CATEGORIES[cat_id]
+        words = self.db.by_category(cat_id)
+        _show_words(self.words_store, words)
+
+        if self.get_application().settings.get("tts_enabled", True):
+            # Render the category's words so the speaker buttons answer at once
+            warm_up([(w.sv, "sv") for w in words] + [(w.en, "en") for w in words])
+
+        self.statusbar.set_text(_("{count} words in {category}").format(count=len(words), category=cat_info["name"]))
 
     def _go_home(self, *_args):
+        get_loader().cancel_all()
+        self._category_request += 1
+        self.search_controller.cancel()
         self.stack.set_visible_child_name("categories")
         self.back_btn.set_visible(False)
         self.title_widget.set_subtitle(_("Bilingual picture dictionary"))
-        self.statusbar.set_text(_("{count} words in dictionary").format(count=len(self.db.words)))
+        self.statusbar.set_text(_("{count} words in dictionary").format(count=self.db.word_count()))
         self.search_btn.set_active(False)
 
     def _on_search_toggled(self, btn):
@@ -477,21 +532,15 @@ class BildordbokWindow(Adw.ApplicationWindow):
     def _on_search_changed(self, entry):
         query = entry.get_text()
         if not query.strip():
+            self.search_controller.cancel()
             if self.stack.get_visible_child_name() == "search":
                 self._go_home()
             return
+        self.search_controller.query_changed(query)
 
-        results = self.db.search(query)
-
-        while True:
-            child = self.search_flow.get_first_child()
-            if child is None:
-                break
-            self.search_flow.remove(child)
-
-        for word in results:
-            card = WordCard(word)
-            self.search_flow.append(card)
+    def _show_search_results(self, query, results):
+        get_loader().cancel_all()
+        _show_words(self.search_store, results)
 
         self.back_btn.set_visible(True)
         self.stack.set_visible_child_name("search")
@@ -526,6 +575,14 @@ def _load_settings():
             pass
     return {}
 
+def _cache_summary(stats):
+    """One-line description of ARASAAC image cache stats."""
+    return _("{files} files, {size:.1f} of {limit:.0f} MB — {hits} hits, "
+             "{misses} misses, {evictions} evicted").format(
+        files=stats["files"], size=stats["bytes"] / (1024 * 1024),
+        limit=stats["max_bytes"] / (1024 * 1024), hits=stats["hits"],
+        misses=stats["misses"], evictions=stats["evictions"])
+
 def _save_settings(settings):
     CONFIG_DIR.mkdir(parents=True, exist_ok=True)
     (CONFIG_DIR / "settings.json").write_text(
@@ -589,6 +646,7 @@ class BildordbokApp(Adw.Application):
             win = BildordbokWindow(self)
         self._apply_theme()
         self._apply_tts_settings()
+        self._apply_cache_settings()
         win.present()
         if not self.settings.get("welcome_shown"):
             self._show_welcome(win)
@@ -621,6 +679,15 @@ class BildordbokApp(Adw.Application):
         }
         mgr.set_color_scheme(schemes.get(theme, Adw.ColorScheme.DEFAULT))
 
+    def _apply_tts_settings(self):
+        tts.configure({"engine": self.settings.get("tts_engine", "auto"),
+                       "speed": self.settings.get("tts_speed", 1.0)})
+
+    def _apply_cache_settings(self):
+        mb = self.settings.get("image_cache_mb")
+        if mb:
+            arasaac.get_provider().images.set_max_bytes(int(mb) * 1024 * 1024)
+
     def _show_welcome(self, win):
         dialog = Adw.Dialog()
         dialog.set_title(_("Welcome"))
@@ -660,6 +727,8 @@ class BildordbokApp(Adw.Application):
         dialog.close()
 
     def _on_preferences(self, *_args):
+        # Pick up speech engines, players or voices installed since start
+        capabilities.refresh()
         prefs = Adw.PreferencesDialog()
         prefs.set_title(_("Preferences"))
 
@@ -742,12 +811,9 @@ class BildordbokApp(Adw.Application):
 
         cache_group = Adw.PreferencesGroup()
         cache_group.set_title(_("ARASAAC Cache"))
-        cache_dir = Path(GLib.get_user_cache_dir()) / "arasaac"
-        cache_size = sum(f.stat().st_size for f in cache_dir.glob("*")
-                         if f.is_file()) if cache_dir.exists() else 0
         cache_row = Adw.ActionRow()
         cache_row.set_title(_("Cached pictograms"))
-        cache_row.set_subtitle(f"{cache_size / (1024*1024):.1f} MB")
+        cache_row.set_subtitle(_cache_summary(arasaac.get_provider().cache_stats()))
         clear_btn = Gtk.Button(label=_("Clear"))
         clear_btn.add_css_class("destructive-action")
         clear_btn.set_valign(Gtk.Align.CENTER)
@@ -784,13 +850,23 @@ class BildordbokApp(Adw.Application):
         self.settings["tts_enabled"] = row.get_active()
         _save_settings(self.settings)
 
+    def _on_tts_engine_changed(self, row, *_):
+        self.settings["tts_engine"] = ["auto", "piper", "espeak"][row.get_selected()]
+        _save_settings(self.settings)
+        self._apply_tts_settings()
+
+    def _on_tts_speed_changed(self, scale):
+        self.settings["tts_speed"] = round(scale.get_value(), 1)
+        _save_settings(self.settings)
+        self._apply_tts_settings()
+
     def _on_clear_cache(self, btn, row):
-        cache_dir = Path(GLib.get_user_cache_dir()) / "arasaac"
-        if cache_dir.exists():
-            for f in cache_dir.glob("*"):
-                if f.is_file():
-                    f.unlink()
-        row.set_subtitle("0.0 MB")
+        provider = arasaac.get_provider()
+        provider.clear_cache()
+        get_loader().thumbnails.clear()
+        get_loader().textures.clear()
+        get_audio_cache().clear()
+        row.set_subtitle(_cache_summary(provider.cache_stats()))
         btn.set_sensitive(False)
         btn.set_label(_("Cleared"))
 
@@ -802,9 +878,15 @@ class BildordbokApp(Adw.Application):
         win = self.props.active_window
         if win and hasattr(win, 'db'):
             from bildordbok.export import show_export_dialog
-            show_export_dialog(win, win.db.words,
-                               status_callback=getattr(win, 'statusbar', None) and
-                               (lambda t: win.statusbar.set_text(t)))
+
+            def show():
+                show_export_dialog(win, win.db.words,
+                                   status_callback=getattr(win, 'statusbar', None) and
+                                   (lambda t: win.statusbar.set_text(t)))
+                return False
+
+            # Every pack word goes in the PDF; read them off the main thread
+            win.db.load_in_background(on_done=lambda: GLib.idle_add(show))
 
     def _on_about(self, *_args):
         about = Adw.AboutDialog(
@@ -900,6 +982,10 @@ class BildordbokApp(Adw.Application):
         win.present()
 
 def main():
+    if any(a.split("=", 1)[0] in ("--prefetch", "--import-cache", "--archive")
+           for a in sys.argv[1:]):
+        from bildordbok.prefetch import main as prefetch_main
+        sys.exit(prefetch_main(sys.argv[1:]))
     app = BildordbokApp()
     app.run(sys.argv)
 
@@ -0,0 +1,215 @@
+"""Precompiled, memory-mapped form of the ARASAAC ordlista.
+
+``arasaac_en2sv.json`` and ``arasaac_sv.json`` are compiled into a single
+``ordlista.bin`` holding three sorted string tables (en→sv, sv→en and
+sv→pictogram IDs). The file is mapped with ``mmap`` and looked up with
+binary search, so opening it costs a header read instead of a full JSON
+parse, and the data lives in shared, file-backed pages.
+
+Layout (all integers little-endian uint32):
+    header      magic "BORD", version, table count
+    directory   per table: 8-byte name, offset, entry count
+    table       key offsets[count + 1], value offsets[count + 1],
+                key bytes, value bytes
+
+Keys are UTF-8 and sorted bytewise. Offsets are absolute file positions.
+
+Build:
+    python -m bildordbok.ordlista [OUTPUT]
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import struct
+import sys
+from collections.abc import Mapping
+from importlib import resources
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+MAGIC = b"BORD"
+VERSION = 1
+FILENAME = "ordlista.bin"
+
+_HEADER = struct.Struct("<4sII")
+_DIR_ENTRY = struct.Struct("<8sII")
+_U32 = struct.Struct("<I")
+
+# Value encodings
+_STR = "str"        # single UTF-8 string
+_STRLIST = "strlist"  # NUL-separated UTF-8 strings
+_IDS = "ids"        # packed uint32 array
+
+
+class Table(Mapping):
+    """Read-only mapping over one sorted string table."""
+
+    def __init__(self, buf, offset: int, count: int, kind: str):
+        self._buf = buf
+        self._count = count
+        self._kind = kind
+        self._key_offsets = offset
+        self._value_offsets = offset + (count + 1) * _U32.size
+
+    def _key_span(self, i: int) -> tuple[int, int]:
+        start, = _U32.unpack_from(self._buf, self._key_offsets + i * _U32.size)
+        end, = _U32.unpack_from(self._buf, self._key_offsets + (i + 1) * _U32.size)
+        return start, end
+
+    def _key(self, i: int) -> bytes:
+        start, end = self._key_span(i)
+        return self._buf[start:end]
+
+    def _value(self, i: int):
+        start, = _U32.unpack_from(self._buf, self._value_offsets + i * _U32.size)
+        end, = _U32.unpack_from(self._buf, self._value_offsets + (i + 1) * _U32.size)
+        raw = self._buf[start:end]
+        if self._kind == _IDS:
+            return list(struct.unpack(f"<{len(raw) // 4}I", raw))
+        text = raw.decode("utf-8")
+        if self._kind == _STRLIST:
+            return text.split("\0") if text else []
+        return text
+
+    def _find(self, key: str) -> int:
+        needle = key.encode("utf-8")
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < needle:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._count and self._key(lo) == needle:
+            return lo
+        return -1
+
+    def __getitem__(self, key):
+        if not isinstance(key, str):
+            raise KeyError(key)
+        i = self._find(key)
+        if i < 0:
+            raise KeyError(key)
+        return self._value(i)
+
+    def __contains__(self, key) -> bool:
+        return isinstance(key, str) and self._find(key) >= 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self._count):
+            yield self._key(i).decode("utf-8")
+
+
+class CompiledOrdlista:
+    """The three ordlista tables backed by one mapped file."""
+
+    def __init__(self, buf):
+        self._buf = buf
+        magic, version, ntables = _HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a compiled ordlista")
+        kinds = {"en2sv": _STR, "sv2en": _STRLIST, "sv2id": _IDS}
+        tables = {}
+        for i in range(ntables):
+            name, offset, count = _DIR_ENTRY.unpack_from(
+                buf, _HEADER.size + i * _DIR_ENTRY.size)
+            name = name.rstrip(b"\0").decode("ascii")
+            if name in kinds:
+                tables[name] = Table(buf, offset, count, kinds[name])
+        missing = set(kinds) - set(tables)
+        if missing:
+            raise ValueError(f"compiled ordlista lacks {', '.join(sorted(missing))}")
+        self.en2sv: Table = tables["en2sv"]
+        self.sv2en: Table = tables["sv2en"]
+        self.sv2id: Table = tables["sv2id"]
+
+    @classmethod
+    def open(cls, path) -> "CompiledOrdlista":
+        with open(path, "rb") as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buf)
+
+
+def _data_path(filename: str) -> Optional[Path]:
+    """Locate a file in the package data directory on disk."""
+    # The plain path is free; importlib.resources costs several ms cold
+    data_file = Path(__file__).parent / "data" / filename
+    if data_file.is_file():
+        return data_file
+    try:
+        pkg = __name__.rsplit(".", 1)[0]
+        ref = resources.files(pkg).joinpath("data").joinpath(filename)
+        if isinstance(ref, Path) and ref.is_file():
+            return ref
+    except (TypeError, ModuleNotFoundError):
+        pass
+    return None
+
+
+def load_compiled() -> Optional[CompiledOrdlista]:
+    """Open the bundled ordlista.bin, or None if it is missing or invalid."""
+    path = _data_path(FILENAME)
+    if path is None:
+        return None
+    try:
+        return CompiledOrdlista.open(path)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def _encode(kind: str, value) -> bytes:
+    if kind == _IDS:
+        return struct.pack(f"<{len(value)}I", *value)
+    if kind == _STRLIST:
+        return "\0".join(value).encode("utf-8")
+    return value.encode("utf-8")
+
+
+def compile_tables(en2sv: Dict[str, str], sv_index: Dict[str, List[int]]) -> bytes:
+    """Serialize the ordlista dictionaries into the compiled format."""
+    sv2en: Dict[str, List[str]] = {}
+    for en_term, sv_term in en2sv.items():
+        sv2en.setdefault(sv_term, []).append(en_term)
+    ids = {term: picto_ids for term, picto_ids in sv_index.items()
+           if isinstance(picto_ids, list)}
+    tables = [("en2sv", _STR, en2sv), ("sv2en", _STRLIST, sv2en), ("sv2id", _IDS, ids)]
+
+    out = bytearray(_HEADER.pack(MAGIC, VERSION, len(tables)))
+    directory_at = len(out)
+    out += bytes(_DIR_ENTRY.size * len(tables))
+    for i, (name, kind, mapping) in enumerate(tables):
+        items = sorted((k.encode("utf-8"), _encode(kind, v)) for k, v in mapping.items())
+        offset = len(out)
+        _DIR_ENTRY.pack_into(out, directory_at + i * _DIR_ENTRY.size,
+                             name.encode("ascii"), offset, len(items))
+        n = len(items)
+        keys_at = offset + 2 * (n + 1) * _U32.size
+        values_at = keys_at + sum(len(k) for k, _ in items)
+        key_offsets, value_offsets = [keys_at], [values_at]
+        for k, v in items:
+            key_offsets.append(key_offsets[-1] + len(k))
+            value_offsets.append(value_offsets[-1] + len(v))
+        out += struct.pack(f"<{n + 1}I", *key_offsets)
+        out += struct.pack(f"<{n + 1}I", *value_offsets)
+        out += b"".join(k for k, _ in items)
+        out += b"".join(v for _, v in items)
+    return bytes(out)
+
+
+def build(output: Optional[str] = None) -> Path:
+    """Compile the bundled JSON ordlista into ordlista.bin."""
+    data_dir = Path(__file__).parent / "data"
+    en2sv = json.loads((data_dir / "arasaac_en2sv.json").read_text(encoding="utf-8"))
+    sv_index = json.loads((data_dir / "arasaac_sv.json").read_text(encoding="utf-8"))
+    out_path = Path(output) if output else data_dir / FILENAME
+    out_path.write_bytes(compile_tables(en2sv, sv_index))
+    return out_path
+
+
+if __name__ == "__main__":
+    print(build(sys.argv[1] if len(sys.argv) > 1 else None))
@@ -0,0 +1,183 @@
+"""Vocabulary packs: extra word lists installed as files.
+
+A pack is a UTF-8 JSON Lines file (``*.pack``). The first line is a
+header with the pack name and its categories; the words follow, grouped
+by category, one ``[sv, en, emoji]`` array per line::
+
+    {"format": "bildordbok-pack", "version": 1, "name": "SFI A",
+     "categories": {"sfi-a-mat": {"name": "Food (SFI A)", "icon": "🥖",
+                                  "offset": 0, "count": 412}, ...}}
+    ["bröd", "bread", "🍞"]
+    ...
+
+``offset`` is the byte offset of a category's first word counted from
+the end of the header line, so mounting a pack reads only the header
+and a category's words are read when that category is first needed.
+
+Packs are looked up in ``~/.local/share/bildordbok/packs`` and
+``<prefix>/share/bildordbok/packs``. Build one from a tab-separated
+file (category, sv, en, emoji) with::
+
+    python -m bildordbok.packs words.tsv sfi-a.pack --name "SFI A"
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, Tuple
+
+PACK_FORMAT = "bildordbok-pack"
+PACK_VERSION = 1
+PACK_SUFFIX = ".pack"
+
+Word = Tuple[str, str, str]  # (sv, en, emoji)
+
+
+class PackError(ValueError):
+    """A pack file is missing, truncated or not in the pack format."""
+
+
+def pack_dirs() -> List[Path]:
+    return [Path(os.path.expanduser("~/.local/share/bildordbok/packs")),
+            Path(sys.prefix) / "share" / "bildordbok" / "packs"]
+
+
+def _is_size(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+def _is_word(row) -> bool:
+    return isinstance(row, list) and len(row) == 3 and all(isinstance(f, str) for f in row)
+
+
+class VocabularyPack:
+    """A mounted pack: header in memory, words read per category."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        try:
+            with open(self.path, "rb") as f:
+                header_line = f.readline()
+        except OSError as e:
+            raise PackError(f"{self.path}: {e}") from e
+        self._body_start = len(header_line)
+        try:
+            header = json.loads(header_line)
+        except ValueError as e:
+            raise PackError(f"{self.path}: bad header") from e
+        if not isinstance(header, dict) or header.get("format") != PACK_FORMAT:
+            raise PackError(f"{self.path}: not a vocabulary pack")
+        if header.get("version") != PACK_VERSION:
+            raise PackError(f"{self.path}: unsupported version {header.get('version')}")
+        if not isinstance(header.get("name", ""), str):
+            raise PackError(f"{self.path}: name must be a string")
+        self.name: str = header.get("name") or self.path.stem
+        self.categories: Dict[str, dict] = header.get("categories") or {}
+        if not isinstance(self.categories, dict):
+            raise PackError(f"{self.path}: categories must be an object")
+        for cat, meta in self.categories.items():
+            if not (isinstance(meta, dict) and _is_size(meta.get("offset"))
+                    and _is_size(meta.get("count"))):
+                raise PackError(f"{self.path}: bad offset or count for {cat!r}")
+            if not all(isinstance(meta.get(key, ""), str) for key in ("name", "icon")):
+                raise PackError(f"{self.path}: name and icon of {cat!r} must be strings")
+
+    def __repr__(self) -> str:
+        return f"VocabularyPack({str(self.path)!r})"
+
+    def count(self, category: str) -> int:
+        meta = self.categories.get(category)
+        return meta["count"] if meta else 0
+
+    def words(self, category: str) -> Iterator[Word]:
+        """Read the words of one category from disk."""
+        meta = self.categories.get(category)
+        if not meta:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._body_start + meta["offset"])
+            for _ in range(meta["count"]):
+                line = f.readline()
+                if not line:
+                    raise PackError(f"{self.path}: truncated in {category}")
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    raise PackError(f"{self.path}: bad word in {category}") from e
+                if not _is_word(row):
+                    raise PackError(f"{self.path}: words in {category} must be [sv, en, emoji] strings")
+                sv, en, emoji = row
+                yield sv, en, emoji
+
+
+def find_packs() -> List[VocabularyPack]:
+    """Every readable pack in the pack directories, by file name."""
+    packs = []
+    for directory in pack_dirs():
+        try:
+            paths = sorted(directory.glob(f"*{PACK_SUFFIX}"))
+        except OSError:
+            continue
+        for path in paths:
+            try:
+                packs.append(VocabularyPack(path))
+            except PackError:
+                continue
+    return packs
+
+
+def write_pack(path, name: str, categories: Mapping[str, Mapping[str, str]],
+               words: Iterable[Tuple[str, str, str, str]]) -> int:
+    """Write a pack; words are (category, sv, en, emoji). Returns the word count."""
+    grouped: Dict[str, List[bytes]] = {cat: [] for cat in categories}
+    for cat, sv, en, emoji in words:
+        if cat not in grouped:
+            raise PackError(f"category {cat!r} has no metadata")
+        grouped[cat].append(json.dumps([sv, en, emoji], ensure_ascii=False).encode("utf-8") + b"\n")
+    meta = {}
+    offset = 0
+    for cat, lines in grouped.items():
+        meta[cat] = {"name": categories[cat].get("name", cat),
+                     "icon": categories[cat].get("icon", "📦"),
+                     "offset": offset, "count": len(lines)}
+        offset += sum(len(line) for line in lines)
+    header = {"format": PACK_FORMAT, "version": PACK_VERSION, "name": name,
+              "categories": meta}
+    with open(path, "wb") as f:
+        f.write(json.dumps(header, ensure_ascii=False).encode("utf-8") + b"\n")
+        for lines in grouped.values():
+            f.writelines(lines)
+    return sum(len(lines) for lines in grouped.values())
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m bildordbok.packs",
+        description="Build a vocabulary pack from a tab-separated word list.")
+    parser.add_argument("source", help="TSV file: category, sv, en, emoji")
+    parser.add_argument("output", help=f"pack file to write (*{PACK_SUFFIX})")
+    parser.add_argument("--name", help="pack name (default: output file name)")
+    args = parser.parse_args(argv)
+
+    rows = []
+    categories: Dict[str, Dict[str, str]] = {}
+    with open(args.source, encoding="utf-8") as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 3 or line.startswith("#"):
+                continue
+            cat, sv, en = fields[:3]
+            emoji = fields[3] if len(fields) > 3 else "📦"
+            categories.setdefault(cat, {"name": cat.replace("-", " ").capitalize()})
+            rows.append((cat, sv, en, emoji))
+    count = write_pack(args.output, args.name or Path(args.output).stem, categories, rows)
+    print(f"Wrote {count} words in {len(categories)} categories to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""Background pictogram loading for word cards.
+
+ARASAAC searches and image downloads can take seconds, so they run on a
+small worker pool instead of the GTK main thread. Cards show their emoji
+placeholder right away; the decoded texture is handed back to the main
+loop with ``GLib.idle_add`` once it is ready.
+
+Decoded textures are kept in an in-process LRU keyed by (pictogram id,
+display size), and the scaled-down variant is written to a thumbnail
+cache after the first decode, so later views load a tiny PNG instead of
+rescaling the full-size pictogram.
+
+Usage:
+    loader = get_loader()
+    handle = loader.request("cat", card.set_pictogram)
+    ...
+    loader.cancel_all()  # user left the view
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+import gi
+
+gi.require_version("Gdk", "4.0")
+gi.require_version("GdkPixbuf", "2.0")
+
+from gi.repository import Gdk, GLib, GdkPixbuf  # noqa: E402
+
+from bildordbok import arasaac  # noqa: E402
+from bildordbok.cache import FileCache, valid_png  # noqa: E402
+
+MAX_WORKERS = 4
+DEFAULT_SIZE = 96
+MEMORY_CACHE_BYTES = 32 * 1024 * 1024
+THUMBNAIL_CACHE_BYTES = 20 * 1024 * 1024
+
+_Key = Tuple[int, int]  # (pictogram id, display size)
+
+
+class TextureCache:
+    """Thread-safe LRU of decoded textures, capped by pixel bytes."""
+
+    def __init__(self, max_bytes: int = MEMORY_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[_Key, Tuple[Gdk.Texture, int]] = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key: _Key) -> Optional[Gdk.Texture]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: _Key, texture: Gdk.Texture):
+        size = texture.get_width() * texture.get_height() * 4
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (texture, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _key, (_texture, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+class PictogramRequest:
+    """Handle for a pending pictogram load."""
+
+    __slots__ = ("term", "lang", "size", "callback", "generation",
+                 "cancelled", "future")
+
+    def __init__(self, term: str, lang: str, size: int,
+                 callback: Callable[[Gdk.Texture], None], generation: int):
+        self.term = term
+        self.lang = lang
+        self.size = size
+        self.callback = callback
+        self.generation = generation
+        self.cancelled = False
+        self.future: Optional[Future] = None
+
+    def cancel(self):
+        """Drop the result; a queued request never reaches the network."""
+        self.cancelled = True
+        if self.future is not None:
+            self.future.cancel()
+
+
+class PictogramLoader:
+    """Resolve and decode pictograms on a worker pool."""
+
+    def __init__(self, provider: Optional[arasaac.ArasaacProvider] = None,
+                 max_workers: int = MAX_WORKERS):
+        self._provider = provider
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="pictogram")
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.textures = TextureCache()
+        self._thumbnails: Optional[FileCache] = None
+        # (term, lang) → pictogram id, so memory hits skip the worker
+        self._ids: Dict[Tuple[str, str], Optional[int]] = {}
+
+    @property
+    def provider(self) -> arasaac.ArasaacProvider:
+        if self._provider is None:
+            self._provider = arasaac.get_provider()
+        return self._provider
+
+    @property
+    def thumbnails(self) -> FileCache:
+        if self._thumbnails is None:
+            self._thumbnails = FileCache(
+                self.provider.cache_dir / "thumbs", THUMBNAIL_CACHE_BYTES,
+                pattern=r"\d+_\d+\.png", validator=valid_png)
+        return self._thumbnails
+
+    def request(self, term: str, callback: Callable[[Gdk.Texture], None],
+                lang: str = "en", size: int = DEFAULT_SIZE) -> PictogramRequest:
+        """Queue a pictogram load; callback runs on the main loop.
+
+        Textures already in memory are delivered before this returns.
+        """
+        with self._lock:
+            req = PictogramRequest(term, lang, size, callback, self._generation)
+            picto_id = self._ids.get((term, lang))
+        if picto_id is not None:
+            texture = self.textures.get((picto_id, size))
+            if texture is not None:
+                callback(texture)
+                return req
+        req.future = self._executor.submit(self._run, req)
+        return req
+
+    def cancel_all(self):
+        """Invalidate every request made so far (e.g. when leaving a view)."""
+        with self._lock:
+            self._generation += 1
+
+    def _is_stale(self, req: PictogramRequest) -> bool:
+        return req.cancelled or req.generation != self._generation
+
+    def _run(self, req: PictogramRequest):
+        if self._is_stale(req):
+            return
+        try:
+            picto_id = self.provider.search(req.term, lang=req.lang)
+            with self._lock:
+                self._ids[(req.term, req.lang)] = picto_id
+            if picto_id is None or self._is_stale(req):
+                return
+            texture = self._load_texture(picto_id, req.size)
+        except (GLib.Error, OSError):
+            return
+        if texture is not None:
+            GLib.idle_add(self._deliver, req, texture)
+
+    def _load_texture(self, picto_id: int, size: int) -> Optional[Gdk.Texture]:
+        """Memory cache, then thumbnail, then decode and scale the original."""
+        key = (picto_id, size)
+        texture = self.textures.get(key)
+        if texture is not None:
+            return texture
+        thumb_name = f"{picto_id}_{size}.png"
+        thumb = self.thumbnails.get(thumb_name)
+        if thumb is not None:
+            pixbuf = GdkPixbuf.Pixbuf.new_from_file(str(thumb))
+        else:
+            path = self.provider.get_image_path(picto_id, resolution=300)
+            if not path:
+                return None
+            pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(path, size, size, True)
+            ok, data = pixbuf.save_to_bufferv("png", [], [])
+            if ok:
+                self.thumbnails.put(thumb_name, bytes(data))
+        texture = Gdk.Texture.new_for_pixbuf(pixbuf)
+        self.textures.put(key, texture)
+        return texture
+
+    def _deliver(self, req: PictogramRequest, texture: Gdk.Texture):
+        if not self._is_stale(req):
+            req.callback(texture)
+        return False
+
+
+_default_loader: Optional[PictogramLoader] = None
+
+
+def get_loader() -> PictogramLoader:
+    """Get or create the default pictogram loader."""
+    global _default_loader
+    if _default_loader is None:
+        _default_loader = PictogramLoader()
+    return _default_loader
@@ -0,0 +1,89 @@
+"""Command-line pictogram prefetch for offline classroom machines.
+
+Resolves and downloads the pictograms for every word in the database
+(or a term list) into the ARASAAC cache, and packs or unpacks cache
+archives that can be copied between machines.
+
+Usage:
+    bildordbok --prefetch [--resolution 300 ...] [--archive cache.tar.gz]
+    bildordbok --prefetch --terms words.txt --lang sv
+    bildordbok --import-cache cache.tar.gz
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+
+from bildordbok import arasaac
+from bildordbok.words import WordDatabase
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="bildordbok",
+        description="Prefetch ARASAAC pictograms into the local cache.")
+    parser.add_argument("--prefetch", action="store_true",
+                        help="download pictograms for the word database")
+    parser.add_argument("--terms", metavar="FILE",
+                        help="prefetch terms from FILE (one per line) instead")
+    parser.add_argument("--lang", default="en", choices=["en", "sv"],
+                        help="language of the terms (default: en)")
+    parser.add_argument("--resolution", type=int, action="append",
+                        choices=arasaac.VALID_RESOLUTIONS,
+                        help="image resolution, may be repeated (default: 300)")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="parallel downloads (default: 8)")
+    parser.add_argument("--archive", metavar="PATH",
+                        help="write the cache to a .tar.gz archive afterwards")
+    parser.add_argument("--import-cache", metavar="PATH",
+                        help="unpack a cache archive made with --archive")
+    return parser
+
+
+def _load_terms(args) -> list[str]:
+    if args.terms:
+        with open(args.terms, encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+    db = WordDatabase()
+    db.load_all()
+    return [w.get_text(args.lang) for w in db.words]
+
+
+def _print_progress(done: int, total: int, term: str):
+    sys.stderr.write(f"\r[{done}/{total}] {term[:40]:<40}")
+    sys.stderr.flush()
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _parser().parse_args(argv)
+    provider = arasaac.get_provider()
+
+    if args.import_cache:
+        added = provider.import_archive(args.import_cache)
+        print(f"Imported {added} pictograms from {args.import_cache}")
+
+    if args.prefetch:
+        terms = _load_terms(args)
+        stats = provider.prefetch(
+            terms, lang=args.lang, resolutions=args.resolution or [300],
+            workers=args.workers, progress=_print_progress)
+        sys.stderr.write("\n")
+        print("{terms} terms: {resolved} resolved, {missing} without pictogram; "
+              "{downloaded} images downloaded, {cached} already cached, "
+              "{failed} failed".format(**stats))
+        if stats["failed"]:
+            print("Run again to retry the failed downloads.")
+
+    if args.archive:
+        count = provider.export_archive(args.archive)
+        print(f"Wrote {count} pictograms to {args.archive}")
+
+    if not (args.prefetch or args.archive or args.import_cache):
+        _parser().print_help()
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
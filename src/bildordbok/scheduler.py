@@ -0,0 +1,98 @@
+"""Review selection for spaced repetition.
+
+Words are kept in a min-heap on ``next_review`` so a session start pops
+only the cards it needs instead of scanning and shuffling the deck.
+``WordEntry.update_sr`` reschedules a word by pushing a fresh heap entry;
+the outdated entry is skipped when it surfaces (lazy deletion). Unseen
+words are drawn by reservoir sampling.
+"""
+
+from __future__ import annotations
+
+import heapq
+import random
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Rebuild the heap once stale entries outnumber live ones by this factor
+COMPACT_FACTOR = 2
+
+# (next_review, random tiebreak, push number, word id); the tiebreak keeps
+# the order of equally due cards (e.g. all unseen words) random, and only
+# the entry with a word's latest push number is live.
+_HeapItem = Tuple[float, float, int, str]
+
+
+class ReviewScheduler:
+    """Due and unseen word selection for a WordDatabase."""
+
+    def __init__(self, entries: Iterable = ()):
+        self._heap: List[_HeapItem] = []
+        self._entries: Dict[str, object] = {}
+        self._pushed: Dict[str, int] = {}        # word id → latest push number
+        self._pushes = 0
+        self._unseen: Dict[str, None] = {}       # ordered set of ids with reps == 0
+        for entry in entries:
+            self.add(entry)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, entry):
+        self._entries[entry.id] = entry
+        self._push(entry)
+
+    def remove(self, entry):
+        self._entries.pop(entry.id, None)
+        self._pushed.pop(entry.id, None)
+        self._unseen.pop(entry.id, None)
+
+    def reschedule(self, entry):
+        """Called after a word's SR fields change."""
+        if entry.id in self._entries:
+            self._push(entry)
+
+    def _push(self, entry):
+        self._pushes += 1
+        self._pushed[entry.id] = self._pushes
+        heapq.heappush(self._heap, (entry.next_review, random.random(), self._pushes, entry.id))
+        if entry.reps == 0:
+            self._unseen[entry.id] = None
+        else:
+            self._unseen.pop(entry.id, None)
+        if len(self._heap) > COMPACT_FACTOR * max(len(self._pushed), 16):
+            self._compact()
+
+    def _compact(self):
+        self._heap = [item for item in self._heap if self._is_live(item)]
+        heapq.heapify(self._heap)
+
+    def _is_live(self, item: _HeapItem) -> bool:
+        return self._pushed.get(item[3]) == item[2]
+
+    def due(self, count: int, now: Optional[float] = None) -> list:
+        """Up to count earliest-due words, in O(count log n)."""
+        now = time.time() if now is None else now
+        heap = self._heap
+        picked: List[_HeapItem] = []
+        while heap and len(picked) < count and heap[0][0] <= now:
+            item = heapq.heappop(heap)
+            if self._is_live(item):
+                picked.append(item)
+        # Still due until reviewed; update_sr pushes the new time
+        for item in picked:
+            heapq.heappush(heap, item)
+        return [self._entries[word_id] for _due, _tie, _push, word_id in picked]
+
+    def unseen(self, count: int) -> list:
+        """Random sample of up to count words never reviewed (reservoir)."""
+        reservoir: List[str] = []
+        for i, word_id in enumerate(self._unseen):
+            if i < count:
+                reservoir.append(word_id)
+            else:
+                j = random.randint(0, i)
+                if j < count:
+                    reservoir[j] = word_id
+        random.shuffle(reservoir)
+        return [self._entries[word_id] for word_id in reservoir]
@@ -0,0 +1,107 @@
+"""Incremental search for the search bar.
+
+Keystrokes are debounced, a query that extends the previous one only
+re-ranks the previous results, and large dictionaries are searched on a
+worker thread. Results for superseded queries are dropped, so only the
+latest query ever reaches the grid.
+"""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from gi.repository import GLib
+
+from bildordbok.search_index import fold
+from bildordbok.words import WordDatabase, WordEntry
+
+DEBOUNCE_MS = 120
+# Databases larger than this are searched off the main thread
+BACKGROUND_THRESHOLD = 2000
+# Shorter previous queries only hold prefix matches, so they cannot be narrowed
+MIN_NARROW_LEN = 3
+
+
+class SearchController:
+    """Debounce, narrow and run word searches."""
+
+    def __init__(self, db: WordDatabase,
+                 on_results: Callable[[str, List[WordEntry]], None],
+                 debounce_ms: int = DEBOUNCE_MS):
+        self.db = db
+        self.on_results = on_results
+        self.debounce_ms = debounce_ms
+        self._timeout_id = 0
+        self._pending = ""
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._last_query = ""
+        self._last_results: List[WordEntry] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def query_changed(self, text: str):
+        """Schedule a search for text after the debounce delay."""
+        self._pending = text
+        if self._timeout_id:
+            GLib.source_remove(self._timeout_id)
+        self._timeout_id = GLib.timeout_add(self.debounce_ms, self._fire)
+
+    def cancel(self):
+        """Drop any scheduled or running search."""
+        if self._timeout_id:
+            GLib.source_remove(self._timeout_id)
+            self._timeout_id = 0
+        with self._lock:
+            self._generation += 1
+        self._last_query = ""
+        self._last_results = []
+
+    def _fire(self):
+        self._timeout_id = 0
+        query = self._pending
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+        candidates = self._narrowing_candidates(query)
+        if self.db.word_count() < BACKGROUND_THRESHOLD and not self.db.has_unloaded():
+            self._deliver(generation, query, self._search(query, candidates))
+        else:
+            # Large databases, and the first search that reads the packs,
+            # stay off the main thread
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="word-search")
+            self._executor.submit(self._run, generation, query, candidates)
+        return False
+
+    def _narrowing_candidates(self, query: str) -> Optional[List[WordEntry]]:
+        """Previous results, if query only extends the previous query."""
+        last = fold(self._last_query)
+        q = fold(query)
+        if len(last) >= MIN_NARROW_LEN and q.startswith(last) and self._last_results:
+            return self._last_results
+        return None
+
+    def _search(self, query: str, candidates: Optional[List[WordEntry]]) -> List[WordEntry]:
+        if candidates is not None:
+            results = self.db.search(query, candidates=candidates)
+            if results:
+                return results
+            # Nothing direct left; a full search may still find near misses
+        return self.db.search(query)
+
+    def _run(self, generation: int, query: str, candidates):
+        if generation != self._generation:
+            return
+        results = self._search(query, candidates)
+        GLib.idle_add(self._deliver, generation, query, results)
+
+    def _deliver(self, generation: int, query: str, results: List[WordEntry]):
+        if generation != self._generation:
+            return False
+        self._last_query = query
+        self._last_results = results
+        self.on_results(query, results)
+        return False
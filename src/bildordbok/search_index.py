@@ -0,0 +1,231 @@
+"""Ranked, typo-tolerant word search for WordDatabase.
+
+Swedish and English terms are folded (casefold, diacritics removed, so
+"Äpple" matches "apple" and "apple" matches "äpple") and indexed two
+ways: a sorted array of terms and their words for prefix lookups with
+bisect, and trigram postings for substring and misspelling candidates.
+
+Results are ranked: exact match, prefix of the term, prefix of a word
+in the term, substring, then near misses by edit distance.
+"""
+
+from __future__ import annotations
+
+import heapq
+import unicodedata
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Rank buckets, lower is better
+EXACT, PREFIX, WORD_PREFIX, SUBSTRING, FUZZY = range(5)
+
+# Fuzzy matching only kicks in when fewer direct hits than this are found
+FUZZY_MIN_RESULTS = 1
+FUZZY_CANDIDATES = 50
+# One- and two-letter queries match thousands of terms; their ranked
+# results are memoized until the index changes.
+MEMO_MAX_QUERY_LEN = 2
+
+
+def fold(text: str) -> str:
+    """Casefold and strip diacritics (å/ä/ö → a/a/o)."""
+    if text.isascii():
+        return text.lower().strip()
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).strip()
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _padded_trigrams(text: str) -> Set[str]:
+    """Trigrams plus word-edge grams; a superset of _trigrams(text)."""
+    return _trigrams(f" {text} ")
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, giving up (returning limit + 1) past limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+
+class SearchIndex:
+    """Index over entries with ``sv``/``en`` text and a unique ``id``."""
+
+    def __init__(self, entries: Iterable = ()):
+        self._entries: List = []                 # slot → entry (None if removed)
+        self._slots: Dict[str, int] = {}         # entry id → slot
+        self._terms: Dict[int, Tuple[str, ...]] = {}  # slot → folded terms
+        self._grams: Dict[str, Set[int]] = {}    # padded trigram → slots
+        self._sorted: List[Tuple[str, int, bool]] = []  # (key, slot, is_whole_term)
+        self._dirty = False
+        self._memo: Dict[str, List] = {}
+        for entry in entries:
+            self.add(entry)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def add(self, entry):
+        if entry.id in self._slots:
+            self.remove(entry)
+        slot = len(self._entries)
+        self._entries.append(entry)
+        self._slots[entry.id] = slot
+        terms = tuple(dict.fromkeys(t for t in (fold(entry.sv), fold(entry.en)) if t))
+        self._terms[slot] = terms
+        grams = self._grams
+        for term in terms:
+            for gram in _padded_trigrams(term):
+                posting = grams.get(gram)
+                if posting is None:
+                    grams[gram] = {slot}
+                else:
+                    posting.add(slot)
+        self._dirty = True
+        self._memo.clear()
+
+    def remove(self, entry):
+        slot = self._slots.pop(entry.id, None)
+        if slot is None:
+            return
+        self._entries[slot] = None
+        for term in self._terms.pop(slot, ()):
+            for gram in _padded_trigrams(term):
+                self._grams.get(gram, set()).discard(slot)
+        self._dirty = True
+        self._memo.clear()
+
+    def _ensure_sorted(self):
+        if not self._dirty:
+            return
+        keys = []
+        for slot, terms in self._terms.items():
+            for term in terms:
+                keys.append((term, slot, True))
+                words = term.split()
+                for word in words[1:]:
+                    keys.append((word, slot, False))
+        keys.sort()
+        self._sorted = keys
+        self._dirty = False
+
+    def _prefix_matches(self, q: str, ranks: Dict[int, Tuple[int, int, int]]):
+        self._ensure_sorted()
+        keys = self._sorted
+        i = bisect_left(keys, (q,))
+        n = len(keys)
+        while i < n:
+            key, slot, whole = keys[i]
+            if not key.startswith(q):
+                break
+            if whole:
+                best = (EXACT if key == q else PREFIX, len(key), slot)
+            else:
+                best = (WORD_PREFIX, len(key), slot)
+            current = ranks.get(slot)
+            if current is None or best < current:
+                ranks[slot] = best
+            i += 1
+
+    def _substring_matches(self, q: str, ranks: Dict[int, Tuple[int, int, int]]):
+        grams = sorted((self._grams.get(g, set()) for g in _trigrams(q)), key=len)
+        if not grams:
+            return
+        candidates = set(grams[0])
+        for posting in grams[1:]:
+            candidates &= posting
+            if not candidates:
+                return
+        for slot in candidates:
+            if slot in ranks:
+                continue
+            for term in self._terms.get(slot, ()):
+                if q in term:
+                    _note(ranks, slot, SUBSTRING, len(term))
+
+    def _fuzzy_matches(self, q: str, ranks: Dict[int, Tuple[int, int, int]]):
+        counts: Dict[int, int] = {}
+        for gram in _padded_trigrams(q):
+            for slot in self._grams.get(gram, ()):
+                counts[slot] = counts.get(slot, 0) + 1
+        best = heapq.nlargest(FUZZY_CANDIDATES, counts, key=counts.__getitem__)
+        limit = 1 if len(q) <= 5 else 2
+        for slot in best:
+            if slot in ranks:
+                continue
+            for term in self._terms.get(slot, ()):
+                if abs(len(term) - len(q)) > limit:
+                    continue
+                distance = edit_distance(q, term, limit)
+                if distance <= limit:
+                    _note(ranks, slot, FUZZY, distance * 100 + len(term))
+
+    def search(self, query: str, limit: Optional[int] = None,
+               candidates: Optional[Iterable] = None) -> List:
+        """Ranked entries matching query.
+
+        candidates restricts the search to a previous result set, which
+        is how incremental type-ahead narrows results cheaply.
+        """
+        q = fold(query)
+        if not q:
+            return []
+        if candidates is not None:
+            return self._search_within(q, candidates, limit)
+        memoize = len(q) <= MEMO_MAX_QUERY_LEN
+        if memoize and q in self._memo:
+            results = self._memo[q]
+            return results[:limit] if limit is not None else list(results)
+        ranks: Dict[int, Tuple[int, int, int]] = {}
+        self._prefix_matches(q, ranks)
+        if len(q) >= 3:
+            self._substring_matches(q, ranks)
+            if len(ranks) < FUZZY_MIN_RESULTS:
+                self._fuzzy_matches(q, ranks)
+        if memoize:
+            self._memo[q] = self._ordered(ranks, None)
+            return self.search(query, limit)
+        return self._ordered(ranks, limit)
+
+    def _search_within(self, q: str, candidates: Iterable, limit: Optional[int]) -> List:
+        ranks: Dict[int, Tuple[int, int, int]] = {}
+        for entry in candidates:
+            slot = self._slots.get(entry.id)
+            if slot is None:
+                continue
+            for term in self._terms.get(slot, ()):
+                if term == q:
+                    _note(ranks, slot, EXACT, len(term))
+                elif term.startswith(q):
+                    _note(ranks, slot, PREFIX, len(term))
+                elif any(word.startswith(q) for word in term.split()[1:]):
+                    _note(ranks, slot, WORD_PREFIX, len(term))
+                elif len(q) >= 3 and q in term:
+                    _note(ranks, slot, SUBSTRING, len(term))
+        return self._ordered(ranks, limit)
+
+    def _ordered(self, ranks: Dict[int, Tuple[int, int, int]], limit: Optional[int]) -> List:
+        order = sorted(ranks.values())
+        if limit is not None:
+            order = order[:limit]
+        entries = self._entries
+        return [entries[slot] for _rank, _tiebreak, slot in order]
+
+
+def _note(ranks: Dict[int, Tuple[int, int, int]], slot: int, rank: int, tiebreak: int):
+    """Keep the best (rank, tiebreak, slot) seen for a slot."""
+    best = (rank, tiebreak, slot)
+    current = ranks.get(slot)
+    if current is None or best < current:
+        ranks[slot] = best
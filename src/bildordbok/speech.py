@@ -0,0 +1,728 @@
+"""Speech backends: Piper, espeak-ng and a null engine behind one interface.
+
+Every engine implements SpeechBackend:
+
+    synthesize(text, lang)  rendered WAV from the shared audio cache
+    stream(text, lang)      audible speech as soon as it is rendered
+    ipa(words, lang)        IPA transcriptions (espeak-ng only)
+    capabilities()          what the engine can do on this machine
+
+Voice resolution, process management (one Piper process per voice),
+the audio cache and the IPA cache live here once, shared by ``tts``
+(speaking words) and ``phonetics`` (IPA). Discovery
+comes from ``bildordbok.capabilities``.
+
+The audio cache is keyed by engine, voice, speed, pitch and text. IPA
+is cached per (language, word).
+"""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import io
+import json
+import os
+import queue
+import re
+import selectors
+import subprocess
+import tempfile
+import threading
+import wave
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from bildordbok import audio
+from bildordbok.cache import FileCache, SearchCache, valid_wav
+from bildordbok.capabilities import get_capabilities
+
+# Piper voice models
+PIPER_VOICES = {
+    "sv": [
+        ("sv_SE-nst-medium", "Swedish (NST Medium)"),
+    ],
+    "en": [
+        ("en_US-amy-medium", "English (Amy)"),
+    ],
+}
+
+ESPEAK_VOICES = {"sv": "sv", "en": "en"}
+
+_lock = threading.Lock()
+
+# Seconds to wait for Piper to finish one utterance
+PIPER_TIMEOUT = 15
+
+AUDIO_CACHE_BYTES = 64 * 1024 * 1024
+
+# Words per espeak-ng IPA call; each call gets a timeout of 5 s + 10 ms/word
+IPA_BATCH_SIZE = 1000
+IPA_CACHE_ENTRIES = 100000
+IPA_CACHE_TTL = 365 * 86400
+# Clause punctuation would split one input line into several output lines
+_CLAUSE_PUNCT = re.compile(r'[.,;:!?()\[\]"…]+')
+
+# Settings (loaded from app config)
+_settings: dict = {
+    "engine": "auto",       # "auto", "piper", "espeak"
+    "speed": 1.0,           # 0.5 - 2.0
+    "pitch": 1.0,           # 0.5 - 2.0 (espeak only)
+    "piper_voice_sv": "sv_SE-nst-medium",
+    "piper_voice_en": "en_US-amy-medium",
+}
+
+
+def configure(settings: dict):
+    """Update speech settings from app preferences."""
+    changed = {k for k, v in settings.items() if _settings.get(k) != v}
+    _settings.update(settings)
+    if changed & {"speed", "piper_voice_sv", "piper_voice_en"}:
+        # Running workers have the old voice or speed baked in. Called on
+        # the main thread (e.g. per speed slider step), so they are only
+        # detached here and stopped elsewhere.
+        with _workers_lock:
+            stale = list(_workers.values())
+            _workers.clear()
+        _retire(stale)
+
+
+def get_settings() -> dict:
+    """Get current speech settings."""
+    return dict(_settings)
+
+
+class PiperWorker:
+    """A Piper process that keeps one voice model loaded.
+
+    Piper runs with raw output: each request is one line of text on
+    stdin, and the utterance's 16-bit mono PCM comes back on stdout as
+    it is synthesized, so it can be played while Piper is still
+    working. Raw output has no utterance boundaries; Piper logs a
+    real-time factor line on stderr once it has flushed a line's audio,
+    and whatever stdout holds at that point ends the utterance.
+    Requests are served one at a time, and a crashed or hung process is
+    restarted on the next request.
+    """
+
+    def __init__(self, piper: str, model_path: Path, length_scale: float = 1.0):
+        self.piper = piper
+        self.model_path = model_path
+        self.length_scale = length_scale
+        self.rate = _voice_rate(model_path)
+        self._lock = threading.Lock()
+        self._proc: subprocess.Popen | None = None
+        self._chunks: queue.Queue = queue.Queue()
+        self._stopped = False
+
+    @property
+    def key(self) -> tuple:
+        return (self.piper, self.model_path, self.length_scale)
+
+    def _start(self):
+        cmd = [self.piper, "--model", str(self.model_path), "--output-raw"]
+        if self.length_scale != 1.0:
+            cmd += ["--length-scale", f"{self.length_scale:.2f}"]
+        self._proc = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE)
+        # Fresh queue so a dead process's late output cannot be mistaken
+        # for audio from the new one
+        self._chunks = queue.Queue()
+        threading.Thread(target=self._read, args=(self._proc, self._chunks),
+                         daemon=True).start()
+
+    @staticmethod
+    def _read(proc: subprocess.Popen, chunks: queue.Queue):
+        """Queue PCM chunks, _END after each utterance and None at exit."""
+        out, err = proc.stdout.fileno(), proc.stderr.fileno()
+        os.set_blocking(out, False)
+        sel = selectors.DefaultSelector()
+        sel.register(out, selectors.EVENT_READ)
+        sel.register(err, selectors.EVENT_READ)
+        log = b""
+        while sel.get_map():
+            for key, _events in sel.select():
+                if key.fd == out:
+                    pcm, eof = _drain(out)
+                    if pcm:
+                        chunks.put(pcm)
+                    if eof:
+                        sel.unregister(out)
+                    continue
+                try:
+                    data = os.read(err, 4096)
+                except OSError:
+                    data = b""
+                if not data:
+                    sel.unregister(err)
+                    continue
+                *lines, log = (log + data).split(b"\n")
+                for line in lines:
+                    if _UTTERANCE_END in line and out in sel.get_map():
+                        # Piper wrote the utterance before logging this line
+                        pcm, _eof = _drain(out)
+                        if pcm:
+                            chunks.put(pcm)
+                        chunks.put(_END)
+        sel.close()
+        chunks.put(None)  # process exited
+
+    def _alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def synthesize(self, text: str, sink=None,
+                   timeout: float = PIPER_TIMEOUT) -> bytes | None:
+        """Synthesize text and return its PCM, or None.
+
+        ``sink``, if given, is called with each chunk of PCM as Piper
+        produces it.
+        """
+        line = " ".join(text.split())
+        if not line:
+            return None
+        with self._lock:
+            for _attempt in range(2):
+                if self._stopped:
+                    return None
+                if not self._alive():
+                    try:
+                        self._start()
+                    except OSError:
+                        return None
+                pcm, streamed = self._request(line, sink, timeout)
+                if pcm:
+                    return pcm
+                self._stop()
+                if streamed:
+                    # Retrying would play the start of the word twice
+                    return None
+            return None
+
+    def _request(self, line: str, sink, timeout: float) -> tuple[bytes | None, bool]:
+        """PCM for one line, and whether any of it went to the sink."""
+        try:
+            self._proc.stdin.write(line.encode("utf-8") + b"\n")
+            self._proc.stdin.flush()
+        except (OSError, ValueError):
+            return None, False
+        pcm = bytearray()
+        while True:
+            try:
+                chunk = self._chunks.get(timeout=timeout)
+            except queue.Empty:
+                return None, bool(pcm)
+            if chunk is None:
+                return None, bool(pcm)
+            if chunk is _END:
+                return bytes(pcm), bool(pcm)
+            pcm += chunk
+            if sink is not None:
+                sink(chunk)
+
+    def _stop(self):
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            proc.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+    def stop(self):
+        """Stop for good; may wait for a request in progress."""
+        self._stopped = True
+        with self._lock:
+            self._stop()
+
+
+# Logged by Piper after each line's audio; see PiperWorker
+_UTTERANCE_END = b"Real-time factor"
+_END = object()
+
+
+def _drain(fd: int) -> tuple[bytes, bool]:
+    """Everything readable on a non-blocking fd now, and whether it hit EOF."""
+    data = bytearray()
+    while True:
+        try:
+            chunk = os.read(fd, 65536)
+        except BlockingIOError:
+            return bytes(data), False
+        except OSError:
+            return bytes(data), True
+        if not chunk:
+            return bytes(data), True
+        data += chunk
+
+
+def _voice_rate(model_path: Path) -> int:
+    """Sample rate from the voice's .onnx.json config (Piper's default 22050)."""
+    try:
+        config = json.loads(model_path.with_suffix(".onnx.json").read_text())
+        return int(config["audio"]["sample_rate"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return 22050
+
+
+def _wav(pcm: bytes, rate: int) -> bytes:
+    """16-bit mono PCM as WAV file contents."""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(pcm[:len(pcm) & ~1])
+    return buf.getvalue()
+
+
+_workers: dict[Path, PiperWorker] = {}
+_workers_lock = threading.Lock()
+
+
+def _length_scale() -> float:
+    # Speed control via length_scale (inverse: lower = faster)
+    speed = _settings.get("speed", 1.0)
+    return round(1.0 / max(0.3, min(3.0, speed)), 2) if speed != 1.0 else 1.0
+
+
+def _get_worker(piper: str, model_path: Path) -> PiperWorker:
+    """Worker for a voice, replaced when the speed setting has changed."""
+    length_scale = _length_scale()
+    with _workers_lock:
+        worker = _workers.get(model_path)
+        if worker is not None and worker.key != (piper, model_path, length_scale):
+            _retire([worker])
+            worker = None
+        if worker is None:
+            worker = _workers[model_path] = PiperWorker(piper, model_path, length_scale)
+        return worker
+
+
+def _retire(workers: list):
+    """Stop replaced workers on a thread of their own.
+
+    A worker's stop waits for the request it is serving, which can take
+    up to PIPER_TIMEOUT.
+    """
+    if workers:
+        threading.Thread(target=lambda: [w.stop() for w in workers],
+                         name="piper-stop", daemon=True).start()
+
+
+def shutdown():
+    """Stop all Piper workers."""
+    with _workers_lock:
+        workers = list(_workers.values())
+        _workers.clear()
+    for worker in workers:
+        worker.stop()
+
+
+atexit.register(shutdown)
+
+
+def _cache_dir() -> str:
+    return os.path.join(
+        os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "bildordbok")
+
+
+_audio_cache: FileCache | None = None
+
+
+def get_audio_cache() -> FileCache:
+    """On-disk cache of rendered speech (WAV files)."""
+    global _audio_cache
+    with _lock:
+        if _audio_cache is None:
+            _audio_cache = FileCache(os.path.join(_cache_dir(), "audio"), AUDIO_CACHE_BYTES,
+                                     pattern=r"[0-9a-f]{64}\.wav", validator=valid_wav)
+    return _audio_cache
+
+
+def _audio_name(engine: str, voice: str, speed: float, pitch: float | None, text: str) -> str:
+    key = json.dumps([engine, voice, speed, pitch, text], ensure_ascii=False)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest() + ".wav"
+
+
+def _cache_wav(name: str, wav_path: str) -> Path | None:
+    """Move a freshly rendered WAV into the audio cache."""
+    try:
+        with open(wav_path, "rb") as f:
+            data = f.read()
+        os.unlink(wav_path)
+    except OSError:
+        return None
+    return get_audio_cache().put(name, data)
+
+
+class SpeechBackend:
+    """One speech engine. Subclasses fill in what the engine supports."""
+
+    name = "none"
+    # stream() also fills the audio cache, so a cache miss is streamed
+    streams_to_cache = False
+
+    def available(self) -> bool:
+        return False
+
+    def voice(self, lang: str) -> Optional[str]:
+        """Voice id used for lang, or None if the engine cannot speak it."""
+        return None
+
+    def capabilities(self) -> dict:
+        available = self.available()
+        return {"available": available,
+                "synthesize": available and (type(self)._render is not SpeechBackend._render
+                                             or type(self).synthesize is not SpeechBackend.synthesize),
+                "stream": available and type(self).stream is not SpeechBackend.stream,
+                "ipa": available and type(self).ipa is not SpeechBackend.ipa,
+                "voices": self.voices() if available else []}
+
+    def voices(self) -> List[str]:
+        return []
+
+    def _cache_name(self, text: str, lang: str, voice: str) -> str:
+        return _audio_name(self.name, voice, _settings.get("speed", 1.0), None, text)
+
+    def _render(self, text: str, lang: str, voice: str) -> Optional[str]:
+        """Render text to a temporary WAV file; returns its path."""
+        return None
+
+    def cached(self, text: str, lang: str) -> Optional[Path]:
+        voice = self.voice(lang)
+        if voice is None:
+            return None
+        return get_audio_cache().get(self._cache_name(text, lang, voice))
+
+    def synthesize(self, text: str, lang: str) -> Optional[Path]:
+        """Rendered speech as a WAV in the audio cache, rendering if needed."""
+        voice = self.voice(lang)
+        if voice is None:
+            return None
+        name = self._cache_name(text, lang, voice)
+        cached = get_audio_cache().get(name)
+        if cached is not None:
+            return cached
+        wav_path = self._render(text, lang, voice)
+        if not wav_path:
+            return None
+        return _cache_wav(name, wav_path)
+
+    def stream(self, text: str, lang: str, epoch: Optional[int] = None) -> bool:
+        """Start speaking text without waiting for a full render.
+
+        Audio is dropped once the audio epoch moves past ``epoch``.
+        """
+        return False
+
+    def ipa(self, words: List[str], lang: str) -> Dict[str, str]:
+        """IPA for words; words the engine cannot transcribe are left out."""
+        return {}
+
+
+class PiperBackend(SpeechBackend):
+    name = "piper"
+
+    def available(self) -> bool:
+        caps = get_capabilities()
+        return bool(caps.piper and caps.voices)
+
+    def voices(self) -> List[str]:
+        return [name for names in get_capabilities().voices.values() for name in names]
+
+    def model(self, lang: str) -> Optional[Path]:
+        """Configured voice for lang if installed, else any voice for lang."""
+        caps = get_capabilities()
+        if not caps.piper:
+            return None
+        voice_id = _settings.get(f"piper_voice_{lang}",
+                                 PIPER_VOICES.get(lang, [("", "")])[0][0])
+        for directory, names in caps.voices.items():
+            if voice_id in names:
+                return directory / f"{voice_id}.onnx"
+        return caps.find_voice(lang)
+
+    def voice(self, lang: str) -> Optional[str]:
+        model = self.model(lang)
+        return model.stem if model else None
+
+    streams_to_cache = True
+
+    def _worker(self, lang: str) -> Optional[PiperWorker]:
+        model = self.model(lang)
+        if model is None:
+            return None
+        return _get_worker(get_capabilities().piper, model)
+
+    def synthesize(self, text: str, lang: str) -> Optional[Path]:
+        cached = self.cached(text, lang)
+        if cached is not None:
+            return cached
+        worker = self._worker(lang)
+        if worker is None:
+            return None
+        return self._cache_pcm(text, lang, worker, worker.synthesize(text))
+
+    def stream(self, text: str, lang: str, epoch: Optional[int] = None) -> bool:
+        """Play Piper's PCM as it arrives and cache the utterance."""
+        worker = self._worker(lang)
+        if worker is None:
+            return False
+        if epoch is None:
+            epoch = audio.epoch()
+        player = audio.get_player(worker.rate)
+        if player is None:
+            # Only WAV players installed: render first
+            path = self.synthesize(text, lang)
+            return path is not None and audio.play_wav(str(path), epoch)
+        state = {"carry": b"", "playing": True}
+
+        def play(chunk: bytes):
+            # Whole samples only, so a cut-off word cannot shift the next one
+            data = state["carry"] + chunk
+            whole = len(data) & ~1
+            state["carry"] = data[whole:]
+            if whole and state["playing"]:
+                state["playing"] = player.write(data[:whole], epoch)
+
+        pcm = worker.synthesize(text, sink=play)
+        # Cached even if a barge-in cut it off, for the next time
+        self._cache_pcm(text, lang, worker, pcm)
+        return pcm is not None and state["playing"]
+
+    def _cache_pcm(self, text: str, lang: str, worker: PiperWorker,
+                   pcm: Optional[bytes]) -> Optional[Path]:
+        if not pcm:
+            return None
+        name = self._cache_name(text, lang, worker.model_path.stem)
+        return get_audio_cache().put(name, _wav(pcm, worker.rate))
+
+
+class EspeakBackend(SpeechBackend):
+    name = "espeak"
+
+    def available(self) -> bool:
+        return get_capabilities().espeak is not None
+
+    def voices(self) -> List[str]:
+        return sorted(set(ESPEAK_VOICES.values()))
+
+    def voice(self, lang: str) -> Optional[str]:
+        return ESPEAK_VOICES.get(lang, lang) if self.available() else None
+
+    def _args(self, voice: str) -> List[str]:
+        wpm = int(130 * _settings.get("speed", 1.0))
+        pitch_val = int(50 * _settings.get("pitch", 1.0))
+        return ["-v", voice, "-s", str(wpm), "-p", str(pitch_val)]
+
+    def _cache_name(self, text: str, lang: str, voice: str) -> str:
+        return _audio_name(self.name, voice, _settings.get("speed", 1.0),
+                           _settings.get("pitch", 1.0), text)
+
+    def _render(self, text: str, lang: str, voice: str) -> Optional[str]:
+        fd, wav_path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            proc = subprocess.run(
+                [get_capabilities().espeak, *self._args(voice), "-w", wav_path, text],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=PIPER_TIMEOUT)
+        except (subprocess.TimeoutExpired, OSError):
+            proc = None
+        if proc is None or proc.returncode != 0:
+            try:
+                os.unlink(wav_path)
+            except OSError:
+                pass
+            return None
+        return wav_path
+
+    def stream(self, text: str, lang: str, epoch: Optional[int] = None) -> bool:
+        voice = self.voice(lang)
+        if voice is None:
+            return False
+        try:
+            audio.track(subprocess.Popen(
+                [get_capabilities().espeak, *self._args(voice), text],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        except OSError:
+            return False
+        return True
+
+    def ipa(self, words: List[str], lang: str) -> Dict[str, str]:
+        result = {}
+        for i in range(0, len(words), IPA_BATCH_SIZE):
+            batch = words[i:i + IPA_BATCH_SIZE]
+            ipa = self._ipa_batch(batch, lang)
+            if ipa is None:
+                ipa = [self._ipa_one(w, lang) for w in batch]
+            result.update((w, t) for w, t in zip(batch, ipa) if t)
+        return result
+
+    def _ipa_batch(self, words: List[str], lang: str) -> Optional[List[str]]:
+        """IPA from one espeak-ng run, or None if it cannot be mapped back."""
+        lines = [" ".join(_CLAUSE_PUNCT.sub(" ", w).split()) for w in words]
+        if not all(lines):
+            return None
+        try:
+            # -l: lines shorter than this end a clause, so each word gets its own line
+            result = subprocess.run(
+                [get_capabilities().espeak, "-v", lang, "--ipa", "-q", "-l", "10000", "--stdin"],
+                input="\n".join(lines) + "\n", capture_output=True, text=True,
+                timeout=5 + 0.01 * len(words))
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        out = [line.strip() for line in result.stdout.splitlines() if line.strip()]
+        if result.returncode != 0 or len(out) != len(words):
+            return None
+        return out
+
+    def _ipa_one(self, word: str, lang: str) -> str:
+        try:
+            result = subprocess.run(
+                [get_capabilities().espeak, "-v", lang, "--ipa", "-q", word],
+                capture_output=True, text=True, timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            return ""
+        return result.stdout.strip()
+
+
+class NullBackend(SpeechBackend):
+    """Engine that speaks nowhere; for machines without TTS and for tests.
+
+    Requests are recorded in ``spoken`` as (text, lang).
+    """
+
+    name = "null"
+
+    def __init__(self):
+        self.spoken: deque = deque(maxlen=100)
+
+    def available(self) -> bool:
+        return True
+
+    def voice(self, lang: str) -> Optional[str]:
+        return "null"
+
+    def stream(self, text: str, lang: str, epoch: Optional[int] = None) -> bool:
+        self.spoken.append((text, lang))
+        return True
+
+
+BACKENDS: Dict[str, SpeechBackend] = {
+    "piper": PiperBackend(),
+    "espeak": EspeakBackend(),
+    "null": NullBackend(),
+}
+
+# Engine setting → backends to try, in order
+_ENGINE_ORDER = {
+    "auto": ["piper", "espeak"],
+    "piper": ["piper", "espeak"],
+    "espeak": ["espeak"],
+    "null": ["null"],
+}
+
+
+def get_backend(name: str) -> SpeechBackend:
+    return BACKENDS[name]
+
+
+def backends(engine: Optional[str] = None) -> List[SpeechBackend]:
+    """Available backends for an engine setting (default: from settings)."""
+    order = _ENGINE_ORDER.get(engine or _settings.get("engine", "auto"), _ENGINE_ORDER["auto"])
+    return [BACKENDS[name] for name in order if BACKENDS[name].available()]
+
+
+def speak(text: str, lang: str = "sv", engine: Optional[str] = None,
+          epoch: Optional[int] = None) -> bool:
+    """Speak text now with the first engine that manages to.
+
+    Cached speech is played from the audio cache. On a cache miss, an
+    engine whose stream fills the cache (Piper) is heard while it
+    renders; any other engine renders into the cache and plays the
+    result, so each text is synthesized once. An engine that cannot
+    render speaks directly. Returns False if nothing spoke the text or a
+    barge-in superseded it while it was rendering. ``epoch`` is the
+    audio epoch the request belongs to (default: now).
+    """
+    # Read once: a barge-in while rendering moves it on and drops this text
+    if epoch is None:
+        epoch = audio.epoch()
+    for backend in backends(engine):
+        if backend.streams_to_cache and backend.cached(text, lang) is None:
+            if backend.stream(text, lang, epoch):
+                return True
+            if audio.epoch() != epoch:
+                return False
+            continue
+        path = backend.synthesize(text, lang)
+        if audio.epoch() != epoch:
+            return False
+        if path is not None:
+            return audio.play_wav(str(path), epoch)
+        if not backend.streams_to_cache and backend.stream(text, lang, epoch):
+            return True
+    return False
+
+
+def render(text: str, lang: str = "sv", engine: Optional[str] = None) -> Optional[Path]:
+    """Render text into the audio cache without playing it."""
+    for backend in backends(engine):
+        path = backend.synthesize(text, lang)
+        if path is not None:
+            return path
+    return None
+
+
+def stop_speaking():
+    """Cut off whatever is playing."""
+    audio.stop_all()
+
+
+_ipa_cache: Optional[SearchCache] = None
+
+
+def get_ipa_cache() -> SearchCache:
+    """Persistent (lang, word) → IPA cache."""
+    global _ipa_cache
+    with _lock:
+        if _ipa_cache is None:
+            os.makedirs(_cache_dir(), exist_ok=True)
+            _ipa_cache = SearchCache(os.path.join(_cache_dir(), "ipa.sqlite3"),
+                                     max_entries=IPA_CACHE_ENTRIES, ttl=IPA_CACHE_TTL)
+    return _ipa_cache
+
+
+def _ipa_key(lang: str, word: str) -> str:
+    return f"{lang}\t{word}"
+
+
+def ipa(words: Iterable[str], lang: str = "sv") -> Dict[str, str]:
+    """IPA for each word, from the cache or the first engine that has IPA."""
+    words = list(dict.fromkeys(w for w in words if w and w.strip()))
+    cache = get_ipa_cache()
+    cached = cache.get_many(_ipa_key(lang, w) for w in words)
+    result = {w: cached[_ipa_key(lang, w)] for w in words if _ipa_key(lang, w) in cached}
+    missing = [w for w in words if w not in result]
+    for backend in BACKENDS.values():
+        if not missing:
+            break
+        if not backend.capabilities()["ipa"]:
+            continue
+        fresh = backend.ipa(missing, lang)
+        if fresh:
+            cache.update({_ipa_key(lang, w): t for w, t in fresh.items()})
+            result.update(fresh)
+            missing = [w for w in missing if w not in fresh]
+    return result
+
+
+def capabilities() -> Dict[str, dict]:
+    """Capabilities of every backend, by name."""
+    return {name: backend.capabilities() for name, backend in BACKENDS.items()}
@@ -0,0 +1,197 @@
+"""Crash-safe storage for spaced-repetition progress.
+
+Progress lives in two files: a snapshot (``sr_data.json``, the format
+earlier versions wrote) and an append-only journal next to it
+(``sr_data.journal``) with one JSON line per rating. Ratings are
+appended and fsynced in order by a writer thread, so rating a word never
+waits for the disk and a crash loses at most the ratings of the last few
+milliseconds. Loading replays the journal over the snapshot; once the
+journal grows past a threshold it is folded into a new snapshot, also on
+the writer thread.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List
+
+# Fold the journal into the snapshot after this many ratings
+COMPACT_AFTER = 500
+
+Record = Dict[str, object]
+
+
+class SRJournal:
+    """Snapshot plus append-only journal of SR records keyed by word id."""
+
+    def __init__(self, snapshot_path, compact_after: int = COMPACT_AFTER):
+        self.snapshot_path = Path(snapshot_path)
+        self.journal_path = self.snapshot_path.with_suffix(".journal")
+        self.compact_after = compact_after
+        self._cond = threading.Condition()
+        # ("append", line), ("compact", records) and ("close", None)
+        # jobs, in call order
+        self._jobs: deque = deque()
+        self._writer: threading.Thread | None = None
+        self._busy = False
+        self._file = None  # only used by the writer thread
+        self.pending = 0  # records in the journal, or queued for it
+
+    def records(self) -> Iterator[Record]:
+        """Snapshot records, then journal records in the order written.
+
+        Later records for a word supersede earlier ones. A torn last
+        line from an interrupted append is ignored.
+        """
+        try:
+            data = json.loads(self.snapshot_path.read_text())
+        except (OSError, ValueError):
+            data = []
+        yield from (d for d in data if isinstance(d, dict) and "id" in d)
+        self.pending = 0
+        try:
+            with open(self.journal_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        d = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(d, dict) and "id" in d:
+                        self.pending += 1
+                        yield d
+        except OSError:
+            return
+
+    def append(self, record: Record):
+        """Queue one record; the writer thread appends and fsyncs it."""
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._cond:
+            self.pending += 1
+            self._submit(("append", line))
+
+    def _submit(self, job: tuple):
+        # Called with _cond held
+        self._jobs.append(job)
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._run, name="sr-journal", daemon=True)
+            self._writer.start()
+            atexit.register(self.close)
+        self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._jobs:
+                    self._busy = False
+                    self._cond.notify_all()
+                    self._cond.wait()
+                self._busy = True
+                jobs = list(self._jobs)
+                self._jobs.clear()
+            # Consecutive appends share one write and one fsync
+            lines: List[str] = []
+            for kind, value in jobs:
+                if kind == "append":
+                    lines.append(value)
+                    continue
+                self._write(lines)
+                lines = []
+                if kind == "compact":
+                    self._write_snapshot(value)
+                else:
+                    self._close()
+            self._write(lines)
+
+    def _write(self, lines: List[str]):
+        if not lines:
+            return
+        try:
+            if self._file is None:
+                self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.journal_path, "a", encoding="utf-8")
+                if self._torn():
+                    # Keep the next record off a half-written line
+                    lines.insert(0, "\n")
+            self._file.write("".join(lines))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except OSError:
+            pass
+
+    def _torn(self) -> bool:
+        try:
+            with open(self.journal_path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() == 0:
+                    return False
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) != b"\n"
+        except OSError:
+            return False
+
+    def needs_compaction(self) -> bool:
+        return self.pending >= self.compact_after
+
+    def compact(self, records: Iterable[Record]):
+        """Queue records as the new snapshot, which empties the journal.
+
+        Records appended after this call go to the fresh journal. If the
+        snapshot cannot be written, the journal is kept and compaction
+        is tried again after another compact_after records.
+        """
+        with self._cond:
+            self.pending = 0
+            self._submit(("compact", list(records)))
+
+    def _write_snapshot(self, records: List[Record]):
+        data = json.dumps(records, ensure_ascii=False, separators=(",", ":"))
+        directory = self.snapshot_path.parent
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.snapshot_path)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            return
+        # The snapshot now holds every rating; start a fresh journal
+        self._close()
+        try:
+            with open(self.journal_path, "w", encoding="utf-8"):
+                pass
+        except OSError:
+            pass
+
+    def flush(self):
+        """Wait until every queued record is on disk."""
+        with self._cond:
+            while self._jobs or self._busy:
+                self._cond.wait()
+
+    def close(self):
+        """Write what is queued and close the journal file."""
+        with self._cond:
+            if self._writer is None:
+                return
+            self._submit(("close", None))
+        self.flush()
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
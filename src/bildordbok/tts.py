@@ -1,209 +1,203 @@
 """Text-to-speech with Piper (high quality) and espeak-ng (fallback).
 
 Tries Piper first for natural-sounding Swedish and English speech,
-falls back to espeak-ng if Piper is not available.
+falls back to espeak-ng if Piper is not available. The engines, their
+processes and the audio cache live in ``bildordbok.speech``; this
+module decides when to speak.
+
+All speech goes through one dispatcher thread with a short queue: a
+repeated request is coalesced, and a new one cuts off what is playing.
+``warm_up`` pre-renders a category's words into the audio cache.
 
 Usage:
-    from bildschema.tts import speak
-    speak("Hej!", lang="sv", speed=1.0)
+    from bildordbok.tts import speak
+    speak("Hej!", lang="sv")
 """
 
 from __future__ import annotations
 
-import json
-import os
-import shutil
-import subprocess
-import tempfile
 import threading
-from pathlib import Path
-
-# Piper voice models
-PIPER_VOICES = {
-    "sv": [
-        ("sv_SE-nst-medium", "Swedish (NST Medium)"),
-    ],
-    "en": [
-        ("en_US-amy-medium", "English (Amy)"),
-    ],
-}
-
-ESPEAK_VOICES = {"sv": "sv", "en": "en"}
-
-_piper_path: str | None = None
-_voice_dir: Path | None = None
+import time
+from collections import deque
+from typing import Iterable
+
+from bildordbok import audio, speech
+from bildordbok.speech import (  # noqa: F401  (re-exported for callers)
+    ESPEAK_VOICES, PIPER_VOICES, configure, get_audio_cache, get_settings, shutdown,
+    stop_speaking,
+)
+
 _lock = threading.Lock()
 
-# Settings (loaded from app config)
-_settings: dict = {
-    "engine": "auto",       # "auto", "piper", "espeak"
-    "speed": 1.0,           # 0.5 - 2.0
-    "pitch": 1.0,           # 0.5 - 2.0 (espeak only)
-    "piper_voice_sv": "sv_SE-nst-medium",
-    "piper_voice_en": "en_US-amy-medium",
-}
-
-
-def configure(settings: dict):
-    """Update TTS settings from app preferences."""
-    _settings.update(settings)
-
-
-def get_settings() -> dict:
-    """Get current TTS settings."""
-    return dict(_settings)
-
-
-def _find_piper() -> tuple[str | None, Path | None]:
-    """Find piper binary and voice directory."""
-    piper = shutil.which("piper")
-    if not piper:
-        return None, None
-    candidates = [
-        Path.home() / ".local" / "share" / "piper-voices",
-        Path("/usr/share/piper-voices"),
-        Path("/usr/local/share/piper-voices"),
-    ]
-    xdg = os.environ.get("XDG_DATA_HOME")
-    if xdg:
-        candidates.insert(0, Path(xdg) / "piper-voices")
-    for d in candidates:
-        if d.exists() and any(d.glob("*.onnx")):
-            return piper, d
-    return piper, None
-
-
-def _get_piper() -> tuple[str | None, Path | None]:
-    global _piper_path, _voice_dir
-    with _lock:
-        if _piper_path is None:
-            _piper_path, _voice_dir = _find_piper()
-            if _piper_path is None:
-                _piper_path = ""
-    return (_piper_path or None), _voice_dir
+# Pending speech requests kept by the dispatcher; the oldest is dropped
+MAX_QUEUE = 4
+# A request for what started playing this recently is ignored
+COALESCE_WINDOW = 1.0
+
+# Words pre-rendered per warm_up call
+WARM_UP_LIMIT = 60
 
 
 def get_available_voices(lang: str = "sv") -> list[tuple[str, str]]:
     """Return list of (voice_id, display_name) for given language."""
     voices = []
-    _, voice_dir = _get_piper()
-    if voice_dir:
+    piper = speech.get_backend("piper")
+    if piper.available():
+        installed = set(piper.voices())
         for vid, name in PIPER_VOICES.get(lang, []):
-            if (voice_dir / f"{vid}.onnx").exists():
+            if vid in installed:
                 voices.append((vid, f"Piper: {name}"))
-    espeak = shutil.which("espeak-ng") or shutil.which("espeak")
-    if espeak:
+    if speech.get_backend("espeak").available():
         voices.append(("espeak", "espeak-ng"))
     return voices
 
 
-def _play_wav(wav_path: str):
-    """Play a WAV file using available player."""
-    for player in ["aplay", "paplay", "pw-play", "ffplay"]:
-        exe = shutil.which(player)
-        if exe:
-            args = [exe]
-            if player == "ffplay":
-                args += ["-nodisp", "-autoexit"]
-            args.append(wav_path)
-            try:
-                subprocess.Popen(args,
-                                 stdout=subprocess.DEVNULL,
-                                 stderr=subprocess.DEVNULL)
+class SpeechDispatcher:
+    """Single thread that speaks queued requests.
+
+    The queue holds at most MAX_QUEUE requests. A request equal to one
+    already queued, or to the one that started within COALESCE_WINDOW,
+    is dropped; any other request cuts off the current speech
+    (barge-in) unless it is queued with interrupt=False.
+
+    submit() runs on the GTK main thread, so a barge-in there only
+    invalidates pending audio; players are stopped on the dispatcher
+    thread, and only when something is actually playing.
+    """
+
+    def __init__(self, max_queue: int = MAX_QUEUE):
+        self._cond = threading.Condition()
+        self._queue: deque = deque(maxlen=max_queue)  # (text, lang, submitted, engine)
+        self._current: tuple[str, str] | None = None  # being rendered or started
+        self._last: tuple[str, str] | None = None     # for coalescing
+        self._started = 0.0
+        self._stop_pending = False
+        self._thread: threading.Thread | None = None
+        self._stats = {"requests": 0, "spoken": 0, "coalesced": 0,
+                       "dropped": 0, "interrupted": 0}
+        self._latency_total = 0.0
+        self._latency_last = 0.0
+        self._latency_max = 0.0
+
+    def submit(self, text: str, lang: str = "sv", interrupt: bool = True,
+               engine: str | None = None):
+        with self._cond:
+            self._stats["requests"] += 1
+            key = (text, lang)
+            if any(q[:2] == key for q in self._queue) or (
+                    key == self._last and time.monotonic() - self._started < COALESCE_WINDOW):
+                self._stats["coalesced"] += 1
                 return
-            except Exception:
-                continue
-
-
-def speak_piper(text: str, lang: str = "sv") -> bool:
-    """Speak using Piper. Returns True if successful."""
-    piper, voice_dir = _get_piper()
-    if not piper or not voice_dir:
-        return False
-
-    voice_key = f"piper_voice_{lang}"
-    voice_id = _settings.get(voice_key, PIPER_VOICES.get(lang, [("", "")])[0][0])
-    model_path = voice_dir / f"{voice_id}.onnx"
-    if not model_path.exists():
-        return False
-
-    try:
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
-            wav_path = f.name
-
-        cmd = [piper, "--model", str(model_path), "--output_file", wav_path]
-
-        # Speed control via length_scale (inverse: lower = faster)
-        speed = _settings.get("speed", 1.0)
-        if speed != 1.0:
-            length_scale = 1.0 / max(0.3, min(3.0, speed))
-            cmd += ["--length-scale", f"{length_scale:.2f}"]
-
-        proc = subprocess.run(
-            cmd, input=text.encode("utf-8"),
-            capture_output=True, timeout=15)
-
-        if proc.returncode == 0 and os.path.exists(wav_path):
-            _play_wav(wav_path)
-            def cleanup():
-                import time; time.sleep(10)
-                try: os.unlink(wav_path)
-                except OSError: pass
-            threading.Thread(target=cleanup, daemon=True).start()
-            return True
-    except (subprocess.TimeoutExpired, OSError):
-        pass
-    return False
-
-
-def speak_espeak(text: str, lang: str = "sv"):
-    """Speak using espeak-ng (fallback)."""
-    espeak = shutil.which("espeak-ng") or shutil.which("espeak")
-    if not espeak:
-        return
-    voice = ESPEAK_VOICES.get(lang, lang)
-    speed = _settings.get("speed", 1.0)
-    pitch = _settings.get("pitch", 1.0)
-    wpm = int(130 * speed)
-    pitch_val = int(50 * pitch)
-    try:
-        subprocess.Popen(
-            [espeak, "-v", voice, "-s", str(wpm), "-p", str(pitch_val), text],
-            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    except Exception:
-        pass
-
-
-def speak(text: str, lang: str = "sv"):
+            if interrupt:
+                self._stats["dropped"] += len(self._queue)
+                self._queue.clear()
+                playing = audio.is_playing()
+                if self._current is not None or playing:
+                    self._stats["interrupted"] += 1
+                    audio.cancel_pending()
+                    self._stop_pending = self._stop_pending or playing
+            elif len(self._queue) == self._queue.maxlen:
+                self._stats["dropped"] += 1
+            self._queue.append((text, lang, time.monotonic(), engine))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="tts-dispatcher",
+                                                daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                text, lang, submitted, engine = self._queue.popleft()
+                self._current = self._last = (text, lang)
+                self._started = time.monotonic()
+                stop, self._stop_pending = self._stop_pending, False
+                # A later barge-in moves the epoch on and drops this request
+                epoch = audio.epoch()
+            if stop:
+                # submit() already moved the epoch; kill what still plays
+                audio.stop_playback()
+            # Returns once the audio is handed to a player
+            spoken = speech.speak(text, lang, engine, epoch=epoch)
+            latency = time.monotonic() - submitted
+            with self._cond:
+                self._current = None
+                if not spoken:
+                    continue
+                self._stats["spoken"] += 1
+                self._latency_last = latency
+                self._latency_total += latency
+                self._latency_max = max(self._latency_max, latency)
+
+    def stats(self) -> dict:
+        """Counters, queue depth and request-to-playback latency in ms.
+
+        Latency runs from submit() until the audio reaches a player, so
+        it includes rendering on a cache miss.
+        """
+        with self._cond:
+            spoken = self._stats["spoken"]
+            return dict(self._stats, queue_depth=len(self._queue),
+                        latency_last_ms=round(self._latency_last * 1000, 1),
+                        latency_avg_ms=round(self._latency_total / spoken * 1000, 1) if spoken else 0.0,
+                        latency_max_ms=round(self._latency_max * 1000, 1))
+
+
+_dispatcher: SpeechDispatcher | None = None
+
+
+def get_dispatcher() -> SpeechDispatcher:
+    global _dispatcher
+    with _lock:
+        if _dispatcher is None:
+            _dispatcher = SpeechDispatcher()
+        return _dispatcher
+
+
+def speak(text: str, lang: str = "sv", engine: str | None = None):
     """Speak text using best available TTS engine.
 
-    Respects engine preference from settings.
-    Runs in background thread.
+    Respects engine preference from settings unless engine is given.
+    Returns at once; the request is handed to the dispatcher, cutting
+    off current speech.
+    """
+    get_dispatcher().submit(text, lang, engine=engine)
+
+
+_warm_generation = 0
+
+
+def warm_up(items: Iterable[tuple[str, str]], limit: int = WARM_UP_LIMIT):
+    """Pre-render (text, lang) pairs into the audio cache in the background.
+
+    A later call supersedes a warm-up still in progress.
     """
-    def _do_speak():
-        engine = _settings.get("engine", "auto")
-        if engine == "piper":
-            if not speak_piper(text, lang):
-                speak_espeak(text, lang)
-        elif engine == "espeak":
-            speak_espeak(text, lang)
-        else:  # auto
-            if not speak_piper(text, lang):
-                speak_espeak(text, lang)
+    global _warm_generation
+    items = list(items)[:limit]
+    with _lock:
+        _warm_generation += 1
+        generation = _warm_generation
+
+    def _do_warm_up():
+        for text, lang in items:
+            if generation != _warm_generation:
+                return
+            speech.render(text, lang)
 
-    threading.Thread(target=_do_speak, daemon=True).start()
+    threading.Thread(target=_do_warm_up, daemon=True).start()
 
 
 def get_tts_info() -> str:
     """Return info about available TTS for debug/about dialog."""
-    piper, voice_dir = _get_piper()
+    caps = speech.capabilities()
     parts = []
-    if piper and voice_dir:
-        voices = list(voice_dir.glob("*.onnx"))
-        parts.append(f"Piper ({len(voices)} voices)")
-    espeak = shutil.which("espeak-ng") or shutil.which("espeak")
-    if espeak:
+    if caps["piper"]["available"]:
+        parts.append(f"Piper ({len(caps['piper']['voices'])} voices)")
+    if caps["espeak"]["available"]:
         parts.append("espeak-ng")
-    engine = _settings.get("engine", "auto")
-    speed = _settings.get("speed", 1.0)
+    settings = get_settings()
+    engine = settings.get("engine", "auto")
+    speed = settings.get("speed", 1.0)
     return (", ".join(parts) if parts else "No TTS") + f" [engine={engine}, speed={speed}x]"
@@ -3,14 +3,24 @@
 from __future__ import annotations
 import gettext
 _ = gettext.gettext
-import json
+import math
 import os
-from dataclasses import dataclass, field
-from pathlib import Path
-from typing import Optional
+import threading
+from itertools import islice
+from typing import Iterable, Optional
 import random
 import time
 
+from bildordbok.packs import PackError, VocabularyPack, find_packs
+from bildordbok.scheduler import ReviewScheduler
+from bildordbok.search_index import SearchIndex
+from bildordbok.sr_journal import SRJournal
+from bildordbok.wordstore import EN, SV, WordStore, get_default_store
+
+# Caps on SR state, which WordStore keeps in 32-bit columns
+MAX_INTERVAL = 36500  # days
+MAX_REPS = 100000
+
 CATEGORIES = {
     "djur": {"name": _("Animals"), "icon": "🐾"},
     "mat": {"name": _("Food"), "icon": "🍎"},
@@ -107,17 +117,66 @@ WORDS = [
 ]
 
 
-@dataclass
+def _text_field(col: int) -> property:
+    return property(lambda self: self._store.text(self._row, col),
+                    lambda self, value: self._store.set_text(self._row, col, value))
+
+
+def _column(name: str) -> property:
+    def get(self):
+        return getattr(self._store, name)[self._row]
+
+    def set(self, value):
+        getattr(self._store, name)[self._row] = value
+    return property(get, set)
+
+
 class WordEntry:
-    category: str
-    sv: str
-    en: str
-    emoji: str
+    """A word and its spaced-repetition state, stored as a WordStore row."""
+
+    __slots__ = ("_store", "_row", "_owner")
+    _FIELDS = ("category", "sv", "en", "emoji", "ease", "interval", "next_review", "reps")
+
+    def __init__(self, category: str, sv: str, en: str, emoji: str,
+                 ease: float = 2.5, interval: int = 1, next_review: float = 0.0,
+                 reps: int = 0, store: Optional[WordStore] = None):
+        self._store = store if store is not None else get_default_store()
+        self._row = self._store.append(category, sv, en, emoji,
+                                       ease, interval, next_review, reps)
+        # Set by WordDatabase so update_sr can requeue and journal the word
+        self._owner: Optional["WordDatabase"] = None
+
+    category = property(lambda self: self._store.category(self._row),
+                        lambda self, value: self._store.set_category(self._row, value))
+    sv = _text_field(SV)
+    en = _text_field(EN)
+    emoji = property(lambda self: self._store.emoji(self._row),
+                     lambda self, value: self._store.set_emoji(self._row, value))
     # Spaced repetition fields
-    ease: float = 2.5
-    interval: int = 1  # days
-    next_review: float = 0.0  # timestamp
-    reps: int = 0
+    ease = _column("ease")
+    interval = _column("interval")  # days
+    next_review = _column("next_review")  # timestamp
+    reps = _column("reps")
+
+    def __del__(self):
+        try:
+            self._store.release(self._row)
+        except AttributeError:
+            pass  # __init__ failed before a row was allocated
+
+    def _values(self) -> tuple:
+        return tuple(getattr(self, name) for name in self._FIELDS)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={value!r}" for name, value in zip(self._FIELDS, self._values()))
+        return f"WordEntry({fields})"
+
+    def __eq__(self, other):
+        if not isinstance(other, WordEntry):
+            return NotImplemented
+        return self is other or self._values() == other._values()
+
+    __hash__ = None
 
     @property
     def id(self) -> str:
@@ -137,63 +196,317 @@ class WordEntry:
             elif self.reps == 1:
                 self.interval = 6
             else:
-                self.interval = round(self.interval * self.ease)
+                self.interval = round(min(self.interval * self.ease, MAX_INTERVAL))
             self.ease = max(1.3, self.ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
-            self.reps += 1
+            self.reps = min(self.reps + 1, MAX_REPS)
         self.next_review = time.time() + self.interval * 86400
+        if self._owner is not None:
+            self._owner._sr_updated(self)
+
+    def sr_record(self) -> dict:
+        return {"id": self.id, "ease": self.ease, "interval": self.interval,
+                "next_review": self.next_review, "reps": self.reps}
+
+
+class WordsView:
+    """Read-only, live view of a database's words in insertion order.
+
+    ``len()`` and ``in`` are O(1); iterating walks a copy taken when the
+    iteration starts. Use WordDatabase.snapshot() for a list.
+    """
+
+    __slots__ = ("_db",)
+
+    def __init__(self, db: "WordDatabase"):
+        self._db = db
+
+    def __len__(self) -> int:
+        return len(self._db._by_id)
+
+    def __iter__(self):
+        return iter(self._db.snapshot())
+
+    def __contains__(self, entry) -> bool:
+        return isinstance(entry, WordEntry) and self._db._by_id.get(entry.id) is entry
 
 
 class WordDatabase:
-    def __init__(self):
-        self.words: list[WordEntry] = []
-        self._sr_path = Path(os.path.expanduser("~/.local/share/bildordbok/sr_data.json"))
+    """Words, their categories and SR state, with packs read on demand.
+
+    Pack categories are read when first needed, preferably off the main
+    thread (see load_in_background). Every change to the word store,
+    the indexes and the scheduler happens under one lock, so pack
+    loaders and the main thread can work on the database at once.
+    """
+
+    def __init__(self, packs: Optional[Iterable[VocabularyPack]] = None):
+        self._lock = threading.RLock()
+        self._store = WordStore()
+        # Every word by id, in insertion order; kept in step with
+        # _by_category by add_word/remove_word
+        self._by_id: dict[str, WordEntry] = {}
+        self._by_category: dict[str, dict[str, WordEntry]] = {}
+        self._index: Optional[SearchIndex] = None
+        self._scheduler: Optional[ReviewScheduler] = None
+        self._journal = SRJournal(os.path.expanduser("~/.local/share/bildordbok/sr_data.json"))
+        # Pack categories whose words have not been read yet
+        self._unloaded: dict[str, list[VocabularyPack]] = {}
+        # Categories some thread is reading right now
+        self._loading: dict[str, threading.Event] = {}
+        # SR records for words in unloaded categories
+        self._sr_pending: dict[str, dict] = {}
         self._load_words()
         self._load_sr()
+        for pack in find_packs() if packs is None else packs:
+            self.mount_pack(pack)
+
+    @property
+    def words(self) -> WordsView:
+        """Words loaded so far, in insertion order.
+
+        Pack categories that were never needed are not included; load
+        them first (load_in_background) when every word matters.
+        """
+        return WordsView(self)
+
+    def snapshot(self) -> list[WordEntry]:
+        """A list of the words loaded so far, in insertion order."""
+        with self._lock:
+            return list(self._by_id.values())
+
+    def word_count(self) -> int:
+        """Number of words, without loading packs."""
+        with self._lock:
+            return len(self._by_id) + sum(pack.count(cat) for cat, packs in self._unloaded.items()
+                                          for pack in packs)
 
     def _load_words(self):
-        for cat, sv, en, emoji in WORDS:
-            self.words.append(WordEntry(category=cat, sv=sv, en=en, emoji=emoji))
+        self.import_words(WordEntry(category=cat, sv=sv, en=en, emoji=emoji, store=self._store)
+                          for cat, sv, en, emoji in WORDS)
+
+    def mount_pack(self, pack: VocabularyPack):
+        """Add a pack's categories; its words are read when first needed."""
+        for cat, meta in pack.categories.items():
+            CATEGORIES.setdefault(cat, {"name": meta.get("name", cat),
+                                        "icon": meta.get("icon", "📦")})
+            self._unloaded.setdefault(cat, []).append(pack)
+
+    def _load_category(self, cat: str):
+        """Read a category's pack words, or wait for the thread reading them."""
+        with self._lock:
+            packs = self._unloaded.pop(cat, None)
+            if packs is None:
+                loading = self._loading.get(cat)
+            else:
+                loading = self._loading[cat] = threading.Event()
+        if packs is None:
+            if loading is not None:
+                loading.wait()
+            return
+        try:
+            for pack in packs:
+                # Disk reads happen outside the lock; only the import holds it
+                try:
+                    rows = list(pack.words(cat))
+                except (OSError, ValueError, PackError):
+                    continue
+                with self._lock:
+                    self.import_words(WordEntry(category=cat, sv=sv, en=en, emoji=emoji,
+                                                store=self._store)
+                                      for sv, en, emoji in rows)
+        finally:
+            with self._lock:
+                del self._loading[cat]
+            loading.set()
+
+    def is_loaded(self, cat: str) -> bool:
+        """Whether a category's words are all in memory."""
+        with self._lock:
+            return cat not in self._unloaded and cat not in self._loading
+
+    def has_unloaded(self) -> bool:
+        """Whether any pack category has not been read yet."""
+        with self._lock:
+            return bool(self._unloaded or self._loading)
+
+    def load_all(self):
+        """Read every pack category not loaded yet.
+
+        Blocks on disk reads; on the main thread use load_in_background.
+        """
+        with self._lock:
+            cats = list(self._unloaded) + list(self._loading)
+        for cat in cats:
+            self._load_category(cat)
+
+    def load_in_background(self, categories: Optional[Iterable[str]] = None,
+                           on_done=None):
+        """Read pack categories (default: all) on a worker thread.
+
+        on_done(), if given, is called from that thread once they are
+        in memory.
+        """
+        categories = None if categories is None else list(categories)
+
+        def run():
+            if categories is None:
+                self.load_all()
+            else:
+                for cat in categories:
+                    self._load_category(cat)
+            if on_done is not None:
+                on_done()
+
+        threading.Thread(target=run, name="pack-loader", daemon=True).start()
+
+    def add_word(self, entry: WordEntry) -> WordEntry:
+        """Add a word, replacing any existing word with the same id."""
+        with self._lock:
+            return self._add_word(entry)
+
+    def _add_word(self, entry: WordEntry) -> WordEntry:
+        if entry.id in self._by_id:
+            self._remove_word(entry.id)
+        record = self._sr_pending.pop(entry.id, None)
+        if record is not None:
+            _apply_sr(entry, record)
+        self._by_id[entry.id] = entry
+        self._by_category.setdefault(entry.category, {})[entry.id] = entry
+        entry._owner = self
+        if self._index is not None:
+            self._index.add(entry)
+        if self._scheduler is not None:
+            self._scheduler.add(entry)
+        return entry
+
+    def remove_word(self, word_id: str) -> Optional[WordEntry]:
+        """Remove a word by id; returns the removed entry, if any."""
+        with self._lock:
+            return self._remove_word(word_id)
+
+    def _remove_word(self, word_id: str) -> Optional[WordEntry]:
+        entry = self._by_id.pop(word_id, None)
+        if entry is None:
+            return None
+        in_cat = self._by_category.get(entry.category)
+        if in_cat is not None:
+            in_cat.pop(word_id, None)
+        if self._index is not None:
+            self._index.remove(entry)
+        entry._owner = None
+        if self._scheduler is not None:
+            self._scheduler.remove(entry)
+        return entry
+
+    def import_words(self, entries: Iterable[WordEntry]) -> int:
+        """Add many words (e.g. a user word list); returns how many were new."""
+        added = 0
+        with self._lock:
+            for entry in entries:
+                if entry.id not in self._by_id:
+                    added += 1
+                self._add_word(entry)
+        return added
+
+    def get(self, word_id: str) -> Optional[WordEntry]:
+        self._load_category(word_id.split(":", 1)[0])
+        return self._by_id.get(word_id)
 
     def _load_sr(self):
-        if self._sr_path.exists():
-            try:
-                data = json.loads(self._sr_path.read_text())
-                sr_map = {d["id"]: d for d in data}
-                for w in self.words:
-                    if w.id in sr_map:
-                        d = sr_map[w.id]
-                        w.ease = d.get("ease", 2.5)
-                        w.interval = d.get("interval", 1)
-                        w.next_review = d.get("next_review", 0.0)
-                        w.reps = d.get("reps", 0)
-            except Exception:
-                pass
+        for d in self._journal.records():
+            w = self._by_id.get(d["id"])
+            if w is not None:
+                _apply_sr(w, d)
+            else:
+                self._sr_pending[d["id"]] = d
+
+    def _sr_updated(self, entry: WordEntry):
+        """Called by WordEntry.update_sr after every rating."""
+        with self._lock:
+            if self._scheduler is not None:
+                self._scheduler.reschedule(entry)
+        self._journal.append(entry.sr_record())
+        if self._journal.needs_compaction():
+            self.compact_sr()
 
     def save_sr(self):
-        self._sr_path.parent.mkdir(parents=True, exist_ok=True)
-        data = [
-            {"id": w.id, "ease": w.ease, "interval": w.interval,
-             "next_review": w.next_review, "reps": w.reps}
-            for w in self.words if w.reps > 0
-        ]
-        self._sr_path.write_text(json.dumps(data, ensure_ascii=False, indent=2))
+        """Ratings are journaled as they happen; only fold a long journal."""
+        if self._journal.needs_compaction():
+            self.compact_sr()
+
+    def compact_sr(self):
+        """Write every reviewed word to the snapshot and clear the journal."""
+        with self._lock:
+            records = [w.sr_record() for w in self._by_id.values()
+                       if w.reps > 0 or w.next_review > 0]
+            records += self._sr_pending.values()
+        self._journal.compact(records)
 
     def by_category(self, cat: str) -> list[WordEntry]:
-        return [w for w in self.words if w.category == cat]
+        self._load_category(cat)
+        with self._lock:
+            return list(self._by_category.get(cat, {}).values())
+
+    def category_count(self, cat: str) -> int:
+        with self._lock:
+            return (len(self._by_category.get(cat, ()))
+                    + sum(pack.count(cat) for pack in self._unloaded.get(cat, ())))
+
+    def category_page(self, cat: str, offset: int = 0, limit: int = 50) -> list[WordEntry]:
+        """Words offset..offset+limit of a category, in insertion order."""
+        self._load_category(cat)
+        with self._lock:
+            words = self._by_category.get(cat, {}).values()
+            return list(islice(words, offset, offset + limit))
+
+    def search(self, query: str, candidates: Optional[list[WordEntry]] = None) -> list[WordEntry]:
+        """Ranked matches in Swedish or English, tolerant of typos and å/ä/ö.
 
-    def search(self, query: str) -> list[WordEntry]:
-        q = query.lower().strip()
-        if not q:
-            return []
-        return [w for w in self.words if q in w.sv.lower() or q in w.en.lower()]
+        Reads any pack categories not loaded yet, so the first search
+        belongs on a worker thread (see SearchController).
+        """
+        self.load_all()
+        with self._lock:
+            if self._index is None:
+                self._index = SearchIndex(self._by_id.values())
+            return self._index.search(query, candidates=candidates)
 
-    def due_for_review(self) -> list[WordEntry]:
-        now = time.time()
-        due = [w for w in self.words if w.next_review <= now]
+    @property
+    def scheduler(self) -> ReviewScheduler:
+        """Built on first use from the words in memory.
+
+        Pack words join it as their categories are read, which this
+        starts in the background.
+        """
+        with self._lock:
+            if self._scheduler is None:
+                # After _load_sr has filled in the SR fields
+                self._scheduler = ReviewScheduler(self._by_id.values())
+                if self._unloaded:
+                    self.load_in_background()
+            return self._scheduler
+
+    def due_for_review(self, count: int = 20) -> list[WordEntry]:
+        with self._lock:
+            due = self.scheduler.due(count)
         random.shuffle(due)
-        return due[:20]
+        return due
 
     def new_words(self, count: int = 10) -> list[WordEntry]:
-        unseen = [w for w in self.words if w.reps == 0]
-        random.shuffle(unseen)
-        return unseen[:count]
+        with self._lock:
+            return self.scheduler.unseen(count)
+
+
+def _apply_sr(w: WordEntry, d: dict):
+    # Records come from a file; anything out of range falls back or is clamped
+    w.ease = _number(d.get("ease"), 2.5, 1.3, 1000.0)
+    w.interval = int(_number(d.get("interval"), 1, 1, MAX_INTERVAL))
+    w.next_review = _number(d.get("next_review"), 0.0, 0.0, float("inf"))
+    w.reps = int(_number(d.get("reps"), 0, 0, MAX_REPS))
+
+
+def _number(value, default, low, high):
+    """value clamped to [low, high], or default if it is not a finite number."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        return default
+    return min(max(value, low), high)
@@ -0,0 +1,238 @@
+"""Compact column storage behind WordEntry.
+
+A word used to be a dataclass instance with its own ``__dict__`` and four
+separate str objects, several hundred bytes each. WordStore keeps every
+word as one row in a set of columns instead: Swedish and English text as
+UTF-8 in a shared buffer, category and emoji as indexes into interned
+tables, and the spaced-repetition fields in typed ``array`` columns.
+``WordEntry`` is a small ``__slots__`` view onto a row.
+
+A row is released when its WordEntry is garbage collected and reused
+by the next append, so an entry removed from a database stays valid for
+as long as anything refers to it. Text bytes left behind by released
+rows and edits are reused in place where the new text fits, and the
+buffer is compacted once they make up over half of it.
+
+Run ``python -m bildordbok.wordstore`` to compare bytes per word against
+a plain dataclass for the full ordlista.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+from array import array
+from typing import Dict, List
+
+SV, EN = 0, 1
+
+# Garbage text smaller than this is never worth a compaction
+COMPACT_MIN_BYTES = 64 * 1024
+
+
+class _Interned:
+    """Table of distinct strings, referenced by index."""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self._ids: Dict[str, int] = {}
+
+    def id(self, value: str) -> int:
+        i = self._ids.get(value)
+        if i is None:
+            i = self._ids[value] = len(self.values)
+            self.values.append(sys.intern(value))
+        return i
+
+
+class WordStore:
+    """Struct-of-arrays storage for words and their SR state."""
+
+    def __init__(self):
+        # Guards the text buffer, which compaction rewrites
+        self._lock = threading.Lock()
+        self._text = bytearray()
+        self._starts = array("I")     # two per row: sv, en
+        self._lengths = array("I")    # byte lengths, two per row
+        self._garbage = 0             # bytes of _text no row refers to
+        self._free: List[int] = []    # released rows, reused by append
+        # Rows released by WordEntry.__del__, which may run at any time,
+        # so it only appends here and append() does the rest
+        self._released: List[int] = []
+        self._categories = _Interned()
+        self._symbols = _Interned()
+        self._category = array("H")
+        self._emoji = array("I")
+        self.ease = array("d")
+        self.interval = array("i")
+        self.next_review = array("d")
+        self.reps = array("i")
+
+    def __len__(self) -> int:
+        """Rows in use."""
+        return len(self._category) - len(self._free) - len(self._released)
+
+    def append(self, category: str, sv: str, en: str, emoji: str,
+               ease: float = 2.5, interval: int = 1,
+               next_review: float = 0.0, reps: int = 0) -> int:
+        """Add a row, reusing a released one if there is any; returns its index."""
+        with self._lock:
+            self._collect_released()
+            if self._free:
+                row = self._free.pop()
+                self._category[row] = self._categories.id(category)
+                self._emoji[row] = self._symbols.id(emoji)
+                self.ease[row] = ease
+                self.interval[row] = interval
+                self.next_review[row] = next_review
+                self.reps[row] = reps
+            else:
+                row = len(self._category)
+                # Columns first, so a failed append leaves no half row
+                self.interval.append(interval)
+                self.reps.append(reps)
+                self.ease.append(ease)
+                self.next_review.append(next_review)
+                self._category.append(self._categories.id(category))
+                self._emoji.append(self._symbols.id(emoji))
+                self._starts.extend((0, 0))
+                self._lengths.extend((0, 0))
+            self._put_text(2 * row + SV, sv)
+            self._put_text(2 * row + EN, en)
+            self._maybe_compact()
+        return row
+
+    def release(self, row: int):
+        """Give a row back for reuse; its entry must not be used again."""
+        self._released.append(row)
+
+    def _collect_released(self):
+        while self._released:
+            row = self._released.pop()
+            for i in (2 * row + SV, 2 * row + EN):
+                self._garbage += self._lengths[i]
+                self._lengths[i] = 0
+            self._free.append(row)
+
+    def _put_text(self, i: int, text: str):
+        data = text.encode("utf-8")
+        old = self._lengths[i]
+        if len(data) <= old:
+            # Fits where the old text was; the rest of the slot is garbage
+            start = self._starts[i]
+            self._text[start:start + len(data)] = data
+            self._garbage += old - len(data)
+        else:
+            self._garbage += old
+            self._starts[i] = len(self._text)
+            self._text += data
+        self._lengths[i] = len(data)
+
+    def _maybe_compact(self):
+        if self._garbage > max(COMPACT_MIN_BYTES, len(self._text) // 2):
+            self._compact()
+
+    def _compact(self):
+        """Copy the text still in use into a fresh buffer."""
+        old = memoryview(self._text)
+        text = bytearray()
+        for i, length in enumerate(self._lengths):
+            start, self._starts[i] = self._starts[i], len(text)
+            text += old[start:start + length]
+        old.release()
+        self._text = text
+        self._garbage = 0
+
+    def text(self, row: int, col: int) -> str:
+        i = 2 * row + col
+        with self._lock:
+            start = self._starts[i]
+            return self._text[start:start + self._lengths[i]].decode("utf-8")
+
+    def set_text(self, row: int, col: int, text: str):
+        with self._lock:
+            self._put_text(2 * row + col, text)
+            self._maybe_compact()
+
+    def category(self, row: int) -> str:
+        return self._categories.values[self._category[row]]
+
+    def set_category(self, row: int, category: str):
+        self._category[row] = self._categories.id(category)
+
+    def emoji(self, row: int) -> str:
+        return self._symbols.values[self._emoji[row]]
+
+    def set_emoji(self, row: int, emoji: str):
+        self._emoji[row] = self._symbols.id(emoji)
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns."""
+        columns = (self._starts, self._lengths, self._category, self._emoji,
+                   self.ease, self.interval, self.next_review, self.reps,
+                   self._free, self._released)
+        total = sys.getsizeof(self._text) + sum(sys.getsizeof(c) for c in columns)
+        for table in (self._categories, self._symbols):
+            total += sum(sys.getsizeof(v) for v in table.values)
+        return total
+
+
+_default_store: WordStore | None = None
+
+
+def get_default_store() -> WordStore:
+    """Store for entries created outside a WordDatabase."""
+    global _default_store
+    if _default_store is None:
+        _default_store = WordStore()
+    return _default_store
+
+
+def _benchmark():
+    import gc
+    import tracemalloc
+    from dataclasses import dataclass
+
+    from bildordbok import ordlista
+    from bildordbok.words import WordEntry
+
+    @dataclass
+    class DataclassEntry:
+        category: str
+        sv: str
+        en: str
+        emoji: str
+        ease: float = 2.5
+        interval: int = 1
+        next_review: float = 0.0
+        reps: int = 0
+
+    compiled = ordlista.load_compiled()
+    if compiled is None:
+        sys.exit("ordlista.bin missing; run python -m bildordbok.ordlista")
+    # Decoded up front so both variants get identical, unshared input
+    rows = [(sv, en) for en, sv in compiled.en2sv.items()]
+
+    def measure(make) -> int:
+        gc.collect()
+        tracemalloc.start()
+        words = make()
+        size, _peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del words
+        return size
+
+    # "".join copies each string, as loading from a file would
+    before = measure(lambda: [DataclassEntry("ordlista", "".join(sv), "".join(en), "🔤")
+                              for sv, en in rows])
+    store = WordStore()
+    after = measure(lambda: [WordEntry("ordlista", sv, en, "🔤", store=store)
+                             for sv, en in rows])
+    n = len(rows)
+    print(f"{n} words")
+    print(f"dataclass:  {before / n:7.1f} bytes/word ({before / 1e6:.2f} MB)")
+    print(f"WordStore:  {after / n:7.1f} bytes/word ({after / 1e6:.2f} MB)")
+
+
+if __name__ == "__main__":
+    _benchmark()